@@ -1,19 +1,18 @@
 import pandas as pd
 import zipfile
-from collections import defaultdict
 import os
+import sys
+
+# The CSV loader and profiling live in the qkdsim package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qkdsim.profiling import Profiler
+from qkdsim.qdrift import (DEFAULT_ENV_TOLERANCE, RESULT_COLUMNS, analyze, detect_columns, environment_table,
+                           match_environment, read_csv, to_measurements)
 
 # ---------------------------- Helper: read CSV with fallback ----------------------------
 def read_csv_with_fallback(file, sep=None):
-    encodings_to_try = ["utf-8", "latin1", "cp1250"]
-    last_error = None
-    for enc in encodings_to_try:
-        try:
-            return pd.read_csv(file, sep=sep, engine="python", encoding=enc)
-        except Exception as e:
-            last_error = e
-            continue
-    raise last_error
+    # Encoding and delimiter are sniffed once, then one pass with the pyarrow/C engine
+    return read_csv(file, sep=sep)
 
 # ---------------------------- Setup lookup ----------------------------
 def find_setup_for_file(file_name: str, df_setup: pd.DataFrame):
@@ -35,169 +34,41 @@ def find_setup_for_file(file_name: str, df_setup: pd.DataFrame):
     except Exception:
         return None
 
-def find_environment_for_file(file_name: str, env_files: list[str]):
-    for env_file in env_files:
-        df_env = read_csv_with_fallback(env_file, sep=None) if os.path.exists(env_file) else pd.DataFrame()
-        if df_env.empty:
-            return None
-        try:
-            # Odstrani prve 6 vrstic in ponastavi index
-            df_env = df_env.iloc[6:].reset_index(drop=True)
-            new_columns = [
-                "DATE",
-                "TIME",
-                "HUMIDITY_BOX",
-                "TEMPERATURE_BOX",
-                "HUMIDITY_ROOM",
-                "TEMPERATURE_ROOM",
-            ]
-            df_env.columns = new_columns[:len(df_env.columns)]
-
-            datetime_str = file_name.split("_meas_")[0]
-            date_part, time_part = datetime_str.split("_")
-            year, month, day = date_part.split("-")
-
-            date = f"{int(day):02d}.{int(month):02d}.{int(year)}"
-            time = time_part.replace("-", ":")[:5]  # samo ure in minute
-
-            # Pretvori prvi dve stolpca v string
-            dates = df_env.iloc[:, 0].astype(str)
-            times = df_env.iloc[:, 1].astype(str).str[:5]
-
-            match = df_env[(dates.str.contains(date)) & (times == time)]
-            if not match.empty:
-                return match.iloc[0].to_dict()
-            return None
-        except Exception as e:
-            print(f"Error in find_environment_for_file: {e}")
-            return None
+def find_environment_for_file(file_name: str, env_matches: pd.DataFrame):
+    # env_matches: nearest environment reading per measurement file, from match_environment
+    if file_name in env_matches.index:
+        return env_matches.loc[file_name].to_dict()
+    return None
 
 # ---------------------------- Helpers ----------------------------
 def try_detect_columns(df: pd.DataFrame):
-    cols = [c.lower() for c in df.columns.astype(str)]
-    measure_names = ['measurement', 'measure', 'measure_num', 'meritev', 'id', 'measurement_number', 'measurement_no', 'measure_no']
-    pin44_names = ['pin44', 'pin_44', 'p44', 'pin 44']
-    pin45_names = ['pin45', 'pin_45', 'p45', 'pin 45']
-
-    def find_name(names_list):
-        for n in names_list:
-            if n in cols:
-                return df.columns[cols.index(n)]
-        return None
-
-    measure_col = find_name(measure_names)
-    pin44_col = find_name(pin44_names)
-    pin45_col = find_name(pin45_names)
-    return measure_col, pin44_col, pin45_col
+    return detect_columns(df.columns)
 
 def df_to_measurements(df: pd.DataFrame):
-    measure_col, pin44_col, pin45_col = try_detect_columns(df)
-    measurements = []
-    if measure_col and pin44_col and pin45_col:
-        for _, row in df.iterrows():
-            try:
-                mnum = row[measure_col]
-                p44 = float(row[pin44_col])
-                p45 = float(row[pin45_col])
-                measurements.append((None, mnum, None, p44, p45))
-            except Exception:
-                continue
-        return measurements, (measure_col, pin44_col, pin45_col), None
-
-    try:
-        for _, row in df.iterrows():
-            try:
-                mnum = row.iloc[1]
-                p44 = float(row.iloc[3])
-                p45 = float(row.iloc[4])
-                measurements.append((None, mnum, None, p44, p45))
-            except Exception:
-                continue
-        if measurements:
-            return measurements, ("index_1", "index_3", "index_4"), None
-    except Exception as e:
-        return [], None, str(e)
-    return [], None, "Could not find suitable columns. Please check the file structure."
-
-def active_pin(pin44, pin45):
-    active = (0, 0, 1)
-    try:
-        if pin44 > 3000 and pin45 > 3000:
-            active = (1, 0, 0)
-        elif pin44 < 40 and pin45 > 180:
-            active = (0, 1, 0)
-    except Exception:
-        active = (0, 0, 1)
-    return active
-
-def analyze_measurements(measurements):
-    if not measurements:
-        return {}
-    measurement_groups = defaultdict(list)
-    for m in measurements:
-        if m is not None and len(m) > 4:
-            measurement_groups[m[1]].append(m)
-    results = {}
-    for measure_num, group in measurement_groups.items():
-        total_samples = len(group)
-        if total_samples < 4:
-            results[measure_num] = {
-                'total_samples': total_samples,
-                'pin44_active': 0,
-                'pin45_active': 0,
-                'avg_pin44': 0.0,
-                'avg_pin45': 0.0,
-                'out_of_range': 0,
-            }
-            continue
-        third = group[2]
-        fourth = group[3]
-        try:
-            pin44_values = [float(third[3]), float(fourth[3])]
-            pin45_values = [float(third[4]), float(fourth[4])]
-        except Exception:
-            results[measure_num] = {
-                'total_samples': total_samples,
-                'pin44_active': 0,
-                'pin45_active': 0,
-                'avg_pin44': 0.0,
-                'avg_pin45': 0.0,
-                'out_of_range': 0,
-            }
-            continue
-        avg_pin44 = sum(pin44_values) / 2.0
-        avg_pin45 = sum(pin45_values) / 2.0
-        pin44_active, pin45_active, out_of_range = active_pin(avg_pin44, avg_pin45)
-        results[measure_num] = {
-            'total_samples': total_samples,
-            'pin44_active': pin44_active,
-            'pin45_active': pin45_active,
-            'avg_pin44': avg_pin44,
-            'avg_pin45': avg_pin45,
-            'out_of_range': out_of_range,
-        }
-    return results
-
-def results_to_dataframe(results: dict):
-    rows = []
-    for measure_num, stats in results.items():
-        rows.append({
-            "Measurement Number": measure_num,
-            "Total Samples": stats['total_samples'],
-            "Pin44 Active (1/0)": stats['pin44_active'],
-            "Pin45 Active (1/0)": stats['pin45_active'],
-            "Avg Pin44 (mid points)": round(stats['avg_pin44'], 2),
-            "Avg Pin45 (mid points)": round(stats['avg_pin45'], 2),
-            "Out of Normal Range": stats['out_of_range'],
-        })
-    if not rows:
+    # One row per usable sample: measurement, pin44, pin45
+    measurements, cols_info = to_measurements(df)
+    if cols_info is None:
+        return measurements, None, "Could not find suitable columns. Please check the file structure."
+    return measurements, cols_info, None
+
+def analyze_measurements(measurements: pd.DataFrame):
+    if measurements is None or measurements.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return analyze(measurements)
+
+def results_to_dataframe(results: pd.DataFrame):
+    if results.empty:
         return pd.DataFrame()
-    df = pd.DataFrame(rows)
-    try:
-        df = df.sort_values(by="Measurement Number").reset_index(drop=True)
-    except Exception:
-        pass
-    return df
+    df = results.rename(columns={
+        "measurement": "Measurement Number",
+        "total_samples": "Total Samples",
+        "pin44_active": "Pin44 Active (1/0)",
+        "pin45_active": "Pin45 Active (1/0)",
+        "avg_pin44": "Avg Pin44 (mid points)",
+        "avg_pin45": "Avg Pin45 (mid points)",
+        "out_of_range": "Out of Normal Range",
+    })
+    return df.round({"Avg Pin44 (mid points)": 2, "Avg Pin45 (mid points)": 2})
 
 def build_conclusion_dict(fname, total, pin44_count, pin44_pct,
                           pin45_count, pin45_pct, out_count, out_pct,
@@ -220,6 +91,7 @@ def build_conclusion_dict(fname, total, pin44_count, pin44_pct,
 
 # ---------------------------- MAIN ----------------------------
 if __name__ == "__main__":
+    profiler = Profiler()
     measurement_files = [
         r"L:\AstroMetriQ\QDrift\logs\logs_measurements\2025-09-15_14-20-12_meas_10000.csv",
         r"L:\AstroMetriQ\QDrift\logs\logs_measurements\2025-07-23_14-22-52_meas_10000.csv"
@@ -229,8 +101,17 @@ if __name__ == "__main__":
         r"L:\AstroMetriQ\QDrift\environment\okolje_julij.csv",
         r"L:\AstroMetriQ\QDrift\environment\okolje_september-17.csv"
     ]
-
-    df_setup = read_csv_with_fallback(setup_file, sep=None) if os.path.exists(setup_file) else pd.DataFrame()
+    # Largest gap between a file's start time and the environment reading used for it
+    env_tolerance = DEFAULT_ENV_TOLERANCE
+
+    profiler.start("analiza", files=len(measurement_files), env_files=len(env_files))
+    with profiler.stage("read setup csv"):
+        df_setup = read_csv_with_fallback(setup_file, sep=None) if os.path.exists(setup_file) else pd.DataFrame()
+    with profiler.stage("environment table"):
+        # Every environment log is parsed once, then each file is matched to the nearest reading
+        df_env = environment_table(env_files, sep=None)
+        env_matches = match_environment([os.path.basename(f) for f in measurement_files], df_env, env_tolerance)
+    print(f"Environment readings: {len(df_env)}, matched files: {len(env_matches)}")
 
     all_conclusions = []
     zip_files = []
@@ -240,12 +121,14 @@ if __name__ == "__main__":
         print(f"\n=== Processing file: {fname} ===")
 
         try:
-            df = read_csv_with_fallback(filepath, sep=None)
+            with profiler.stage("read csv"):
+                df = read_csv_with_fallback(filepath, sep=None)
         except Exception as e:
             print(f"Error reading file {fname}: {e}")
             continue
 
-        measurements, cols_info, err = df_to_measurements(df)
+        with profiler.stage("to measurements"):
+            measurements, cols_info, err = df_to_measurements(df)
         if err:
             print(f"Error converting input data: {err}")
             continue
@@ -253,12 +136,14 @@ if __name__ == "__main__":
         print(f"Detected/used columns: {cols_info}")
         print(f"Number of valid imported records: {len(measurements)}")
 
-        results = analyze_measurements(measurements)
-        if not results:
+        with profiler.stage("analyze"):
+            results = analyze_measurements(measurements)
+        if results.empty:
             print("No data to analyze (maybe too few samples).")
             continue
 
-        df_results = results_to_dataframe(results)
+        with profiler.stage("results table"):
+            df_results = results_to_dataframe(results)
         print(df_results)
 
         total = len(df_results)
@@ -275,14 +160,17 @@ if __name__ == "__main__":
         print(f"- Pin45 Active: {pin45_count} ({pin45_pct}%)")
         print(f"- Noise: {out_count} ({out_pct}%)")
 
-        setup_info = find_setup_for_file(fname, df_setup)
-        env_info = find_environment_for_file(fname, env_files)  # vrne slovar
+        with profiler.stage("setup lookup"):
+            setup_info = find_setup_for_file(fname, df_setup)
+        with profiler.stage("environment lookup"):
+            env_info = find_environment_for_file(fname, env_matches)  # vrne slovar
 
         out_csv_name = fname.replace(".csv", "_analysis.csv")
-        df_results.to_csv(out_csv_name, index=False)
+        with profiler.stage("write csv"):
+            df_results.to_csv(out_csv_name, index=False)
+            csv_bytes = df_results.to_csv(index=False).encode("utf-8")
         print(f"Saved analysis to {out_csv_name}")
 
-        csv_bytes = df_results.to_csv(index=False).encode("utf-8")
         zip_files.append((out_csv_name, csv_bytes))
 
         all_conclusions.append(
@@ -302,4 +190,9 @@ if __name__ == "__main__":
     if all_conclusions:
         df_conclusions = pd.DataFrame(all_conclusions)
         df_conclusions.to_csv("all_conclusions.csv", index=False)
-        print("Saved combined conclusions: all_conclusions.csv")
\ No newline at end of file
+        print("Saved combined conclusions: all_conclusions.csv")
+
+    report = profiler.flush()
+    if report is not None:
+        print(f"\nProfile ({report.seconds:.3f} s):")
+        print(report.summary().to_string(index=False))
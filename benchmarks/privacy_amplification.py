@@ -0,0 +1,50 @@
+"""FFT Toeplitz hashing vs. the naive matrix product.
+
+Run from the repository root::
+
+    python -m benchmarks.privacy_amplification [--max-naive 20000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from qkdsim.privacy import toeplitz_hash, toeplitz_hash_naive
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1_000, 5_000, 20_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--ratio", type=float, default=0.5, help="output length as a fraction of n")
+    parser.add_argument("--max-naive", type=int, default=20_000,
+                        help="largest n for which the O(n·m) product is run")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>12}{'m':>12}{'fft [s]':>12}{'naive [s]':>12}{'speed-up':>10}")
+    for n in args.sizes:
+        m = int(n * args.ratio)
+        bits = rng.integers(0, 2, n, dtype=np.uint8)
+        seed = rng.integers(0, 2, n + m - 1, dtype=np.uint8)
+        fast, t_fft = timed(toeplitz_hash, bits, m, seed)
+        if n <= args.max_naive:
+            slow, t_naive = timed(toeplitz_hash_naive, bits, m, seed)
+            assert np.array_equal(fast, slow), "FFT and naive hashes differ"
+            print(f"{n:>12}{m:>12}{t_fft:>12.4f}{t_naive:>12.4f}{t_naive / t_fft:>9.1f}x")
+        else:
+            # Spot-check a few output bits against their matrix rows
+            for i in rng.integers(0, m, 5):
+                row = seed[i - np.arange(n) + n - 1]
+                assert fast[i] == int(row.astype(np.int64) @ bits) & 1
+            print(f"{n:>12}{m:>12}{t_fft:>12.4f}{'-':>12}{'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""QRNG client throughput against the local mock server.
+
+Compares the old single-request, one-bit-per-value approach with the chunked,
+concurrent client. Run from the repository root::
+
+    python -m benchmarks.qrng_client [--bits 1000000] [--latency 0.02]
+"""
+import argparse
+import time
+
+from qkdsim.qrng import QRNGClient, fetch_quantum_bytes
+from qkdsim.qrng_server import MockQRNGServer
+
+
+def bench_sequential_mod2(url, n_bits, chunk):
+    """Baseline: one request per chunk, one after another, keeping only ``x % 2``."""
+    start = time.perf_counter()
+    got = 0
+    while got < n_bits:
+        got += len(fetch_quantum_bytes(min(chunk, n_bits - got), url))
+    return time.perf_counter() - start
+
+
+def bench_client(url, n_bits, workers):
+    with QRNGClient(url, workers=workers) as client:
+        start = time.perf_counter()
+        bits = client.fetch_bits(n_bits)
+        elapsed = time.perf_counter() - start
+        assert len(bits) == n_bits
+        return elapsed, client.requests_sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bits", type=int, default=1_000_000)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated per-request server latency in seconds")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    with MockQRNGServer(delay=args.latency) as server:
+        print(f"Fetching {args.bits} bits, {args.latency * 1000:.0f} ms latency per request")
+        t = bench_sequential_mod2(server.url, args.bits, server._httpd.max_length)
+        print(f"{'sequential, x % 2':<24}{t:8.3f} s {args.bits / t / 1e3:10.1f} kbit/s")
+        for workers in args.workers:
+            t, sent = bench_client(server.url, args.bits, workers)
+            label = f"client, {workers} workers"
+            print(f"{label:<24}{t:8.3f} s {args.bits / t / 1e3:10.1f} kbit/s  ({sent} requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""Benchmark suite with regression tracking.
+
+Times the QKD simulation at several ``n``, the XOR encryption of the Message
+encryption page and the QDrift analysis pipeline (``read_csv_with_fallback``,
+``df_to_measurements``, ``analyze_measurements`` from ``analiza/analiza.py``,
+with the old python-engine CSV parse and the row-by-row analysis as baselines
+up to 10^6 rows, and the environment lookup for a batch of files) on
+synthetic measurement and environment CSVs. The row-by-row case first checks
+that the vectorized analysis gives the same table on a file with text and
+blank pin readings.
+Every case keeps the best and the median of a few repeats; results are
+written as JSON together with the machine they ran on. Run from the
+repository root::
+
+    python -m benchmarks.suite run [--quick] [--only bb84 xor qdrift] [--out results.json]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.1]
+
+The full run goes up to 10^7 photons and 10^7 CSV rows and can take many
+minutes; ``--quick`` keeps to the small sizes. ``compare`` matches cases by
+name and parameters, reports the change of the best time and exits with
+status 1 if any case got slower than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+SIZES = {
+    "bb84": [10_000, 100_000, 1_000_000, 10_000_000],
+    "protocols": [1_000_000],
+    "xor": [100, 1_000, 100_000, 10_000_000],
+    "otp": [100_000, 1_000_000, 10_000_000],
+    "qdrift": [10_000, 100_000, 1_000_000, 10_000_000],
+}
+QUICK_SIZES = {
+    "bb84": [10_000, 100_000],
+    "protocols": [100_000],
+    "xor": [100, 100_000],
+    "otp": [100_000],
+    "qdrift": [10_000],
+}
+# Samples logged per measurement number in the QDrift files
+SAMPLES_PER_MEASUREMENT = 5
+# The python-engine baseline runs out of memory on larger files
+PYTHON_ENGINE_MAX_ROWS = 1_000_000
+
+
+def machine_info() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    info = {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "commit": commit,
+    }
+    try:
+        import pyarrow
+        info["pyarrow"] = pyarrow.__version__
+    except ImportError:
+        info["pyarrow"] = None
+    return info
+
+
+def measure(fn, repeat: int, budget: float) -> list:
+    """Run ``fn`` up to ``repeat`` times, stopping early once ``budget`` seconds are spent."""
+    times = []
+    spent = 0.0
+    while len(times) < repeat and (not times or spent < budget):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        spent += times[-1]
+    return times
+
+
+# --- Cases ---
+# Each generator yields (name, params, items, setup) where setup() returns the callable to time.
+
+def bb84_cases(sizes):
+    from qkdsim import simulate
+
+    for n in sizes["bb84"]:
+        for eve_on in (False, True):
+            yield "bb84/simulate", {"n": n, "eve_on": eve_on}, n, \
+                lambda n=n, eve_on=eve_on: (lambda: simulate(n, eve_on, 0.02, rng=1))
+    for n in sizes["protocols"]:
+        for protocol in ("six_state", "b92", "e91"):
+            yield "protocols/simulate", {"n": n, "protocol": protocol}, n, \
+                lambda n=n, protocol=protocol: (lambda: simulate(n, False, 0.02, rng=1, protocol=protocol))
+
+
+def xor_cases(sizes):
+    from qkdsim.key import PackedKey
+    from qkdsim.otp import bit_table, encrypt_text
+
+    rng = np.random.default_rng(0)
+    for chars in sizes["otp"]:
+        message = rng.integers(32, 127, chars, dtype=np.uint8).tobytes().decode("ascii")
+        pad = PackedKey(rng.integers(0, 256, chars, dtype=np.uint8))
+        yield "xor/encrypt_text", {"chars": chars}, chars * 8, \
+            lambda message=message, pad=pad: (lambda: encrypt_text(message, pad))
+    # The explanation table of one window in the middle of ever longer messages
+    window = 1024
+    for chars in sizes["xor"]:
+        plaintext = rng.integers(32, 127, chars, dtype=np.uint8).tobytes()
+        ciphertext = rng.integers(0, 256, chars, dtype=np.uint8).tobytes()
+        first = max(chars // 2 - window // 2, 0)
+        stop = min(first + window, chars)
+        yield "xor/bit_table", {"chars": chars, "window": window}, (stop - first) * 8, \
+            lambda p=plaintext, c=ciphertext, first=first, stop=stop: (lambda: bit_table(p, c, first * 8, stop * 8))
+
+
+def write_measurement_csv(path: str, rows: int, seed: int = 0, bad_cells: float = 0.0):
+    """
+    Synthetic QDrift log: timestamp, measurement number, sample, pin 44 and pin 45 readings.
+
+    ``bad_cells`` is the share of pin readings replaced by text or left blank.
+    """
+    rng = np.random.default_rng(seed)
+    measurement = np.arange(rows) // SAMPLES_PER_MEASUREMENT + 1
+    # Pin 44 active, pin 45 active or out of range, per measurement
+    state = rng.integers(0, 3, measurement[-1] + 1)[measurement]
+    pin44 = np.select([state == 0, state == 1], [rng.normal(3500, 150, rows), rng.normal(20, 8, rows)],
+                      rng.normal(1000, 600, rows))
+    pin45 = np.select([state == 0, state == 1], [rng.normal(3500, 150, rows), rng.normal(400, 80, rows)],
+                      rng.normal(100, 50, rows))
+    start = np.datetime64("2025-09-15T14:20:12")
+    df = pd.DataFrame({
+        "TIMESTAMP": (start + np.arange(rows) * np.timedelta64(10, "ms")).astype(str),
+        "MEASUREMENT_NUMBER": measurement,
+        "SAMPLE": np.arange(rows) % SAMPLES_PER_MEASUREMENT + 1,
+        "PIN44": np.round(pin44, 1),
+        "PIN45": np.round(pin45, 1),
+    })
+    if bad_cells:
+        for col in ("PIN44", "PIN45"):
+            bad = rng.random(rows) < bad_cells
+            df[col] = df[col].astype(object)
+            df.loc[bad, col] = rng.choice(np.array(["ERR", None], dtype=object), int(bad.sum()))
+    df.to_csv(path, index=False)
+
+
+def write_environment_csv(path: str, days: int, seed: int = 0):
+    """Synthetic environment log: a header line, six metadata rows, then one reading per minute."""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2025-09-01", periods=days * 24 * 60, freq="min")
+    readings = pd.DataFrame({
+        "DATE": times.strftime("%d.%m.%Y"),
+        "TIME": times.strftime("%H:%M"),
+        "HUMIDITY_BOX": np.round(rng.normal(45, 3, len(times)), 1),
+        "TEMPERATURE_BOX": np.round(rng.normal(24, 1, len(times)), 1),
+        "HUMIDITY_ROOM": np.round(rng.normal(50, 5, len(times)), 1),
+        "TEMPERATURE_ROOM": np.round(rng.normal(22, 1, len(times)), 1),
+    })
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("LOGGER,,,,,\n" + "".join(f"META_{i},,,,,\n" for i in range(6)))
+        readings.to_csv(f, index=False, header=False)
+
+
+def qdrift_cases(sizes, data_dir):
+    from analiza.analiza import analyze_measurements, df_to_measurements, read_csv_with_fallback
+    from qkdsim import qdrift
+
+    def reference(path, rows):
+        # Pin columns with text and blank cells; the vectorized analysis must match the row-by-row one
+        if not os.path.exists(path):
+            write_measurement_csv(path, rows, bad_cells=0.05)
+        df = read_csv_with_fallback(path, sep=None)
+        expected = qdrift.analyze_reference(df)
+        pd.testing.assert_frame_equal(qdrift.analyze(qdrift.to_measurements(df)[0]), expected, check_dtype=False)
+        return lambda: qdrift.analyze_reference(df)
+
+    for rows in sizes["qdrift"]:
+        path = os.path.join(data_dir, f"2025-09-15_14-20-12_meas_{rows}.csv")
+
+        def read(path=path, rows=rows):
+            if not os.path.exists(path):
+                write_measurement_csv(path, rows)
+            return lambda: read_csv_with_fallback(path, sep=None)
+
+        def read_python(path=path):
+            # The previous loader: delimiter sniffing by the python engine, first encoding that parses
+            return lambda: pd.read_csv(path, sep=None, engine="python", encoding="utf-8")
+
+        def convert(path=path):
+            df = read_csv_with_fallback(path, sep=None)
+            return lambda: df_to_measurements(df)
+
+        def analyze(path=path):
+            measurements, _, _ = df_to_measurements(read_csv_with_fallback(path, sep=None))
+            return lambda: analyze_measurements(measurements)
+
+        yield "qdrift/read_csv_with_fallback", {"rows": rows}, rows, read
+        if rows <= PYTHON_ENGINE_MAX_ROWS:
+            yield "qdrift/read_csv_python_engine", {"rows": rows}, rows, read_python
+        yield "qdrift/df_to_measurements", {"rows": rows}, rows, convert
+        yield "qdrift/analyze_measurements", {"rows": rows}, rows, analyze
+        if rows <= PYTHON_ENGINE_MAX_ROWS:
+            yield "qdrift/analyze_reference", {"rows": rows}, rows, \
+                lambda rows=rows: reference(os.path.join(data_dir, f"2025-09-15_14-20-12_meas_{rows}_bad.csv"), rows)
+
+    # One month of per-minute environment readings matched to a batch of measurement files
+    env_path = os.path.join(data_dir, "environment.csv")
+    files = 1000
+    starts = pd.date_range("2025-09-01", "2025-09-30", periods=files) + pd.to_timedelta(np.arange(files) % 60, "s")
+    names = [f"{start:%Y-%m-%d_%H-%M-%S}_meas_10000.csv" for start in starts]
+
+    def environment():
+        from qkdsim.qdrift import environment_table, match_environment
+
+        if not os.path.exists(env_path):
+            write_environment_csv(env_path, days=30)
+        return lambda: match_environment(names, environment_table([env_path]))
+
+    yield "qdrift/environment_match", {"files": files, "days": 30}, files, environment
+
+
+GROUPS = {"bb84": bb84_cases, "xor": xor_cases, "qdrift": qdrift_cases}
+
+
+def case_key(name: str, params: dict) -> str:
+    return f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def _run_groups(args, sizes, data_dir) -> list:
+    results = []
+    for group in args.only:
+        cases = GROUPS[group](sizes, data_dir) if group == "qdrift" else GROUPS[group](sizes)
+        for name, params, items, setup in cases:
+            fn = setup()
+            times = measure(fn, args.repeat, args.budget)
+            best = min(times)
+            row = {
+                "name": name,
+                "params": params,
+                "key": case_key(name, params),
+                "repeats": len(times),
+                "best": best,
+                "median": statistics.median(times),
+                "items": items,
+                "items_per_second": items / best if best > 0 else None,
+            }
+            results.append(row)
+            print(f"{row['key']:<60}{best:>10.4f} s{row['items_per_second']:>16,.0f} /s")
+    return results
+
+
+def run(args) -> dict:
+    sizes = QUICK_SIZES if args.quick else SIZES
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="qdrift_bench_")
+    os.makedirs(data_dir, exist_ok=True)
+    try:
+        results = _run_groups(args, sizes, data_dir)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "machine": machine_info(),
+        "quick": args.quick,
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {out}")
+    return report
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> pd.DataFrame:
+    """Per-case change of the best time; ``regression`` marks slowdowns beyond ``threshold``."""
+    old = {r["key"]: r["best"] for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        if r["key"] not in old:
+            continue
+        ratio = r["best"] / old[r["key"]] if old[r["key"]] > 0 else float("inf")
+        rows.append({
+            "case": r["key"],
+            "baseline_s": old[r["key"]],
+            "current_s": r["best"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return pd.DataFrame(rows, columns=["case", "baseline_s", "current_s", "ratio", "regression"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmarks and write a JSON report")
+    p_run.add_argument("--only", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+    p_run.add_argument("--quick", action="store_true", help="small sizes only, for a smoke test")
+    p_run.add_argument("--repeat", type=int, default=5, help="maximum repeats per case")
+    p_run.add_argument("--budget", type=float, default=5.0,
+                       help="stop repeating a case after this many seconds")
+    p_run.add_argument("--data-dir", help="where the synthetic CSVs are kept (temporary by default)")
+    p_run.add_argument("--out", help=f"JSON report path (default: {RESULTS_DIR}/<timestamp>.json)")
+
+    p_cmp = sub.add_parser("compare", help="compare two reports and flag regressions")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.10,
+                       help="relative slowdown of the best time counted as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    df = compare(baseline, current, args.threshold)
+    if baseline["machine"]["host"] != current["machine"]["host"]:
+        print(f"Note: comparing runs from different machines "
+              f"({baseline['machine']['host']} vs {current['machine']['host']}).")
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(df.to_string(index=False, formatters={"ratio": "{:.2f}x".format}))
+    regressions = int(df["regression"].sum())
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,175 +1,227 @@
 import streamlit as st
-import random
-import pandas as pd
-import requests
+import numpy as np
+from io import BytesIO
 
-st.set_page_config(page_title="BB84 Simulation", layout="wide")
-st.title("BB84 Simulation")
+from qkdsim import RoleStreams, run_streaming, simulate
+from qkdsim.cache import ResultCache, cached_simulate
+from qkdsim.cascade import estimate_qber, reconcile
+from qkdsim.channel import ChannelModel, simulate_channel
+from qkdsim.detection import EVE, SequentialTest
+from qkdsim.eve import STRATEGY_LABELS, EveStrategy
+from qkdsim.protocols import PROTOCOLS
+from qkdsim.key import PackedKey
+from qkdsim.keypool import KeyPool
+from qkdsim.privacy import amplify
+from qkdsim.profiling import Profiler, render_sidebar
+from qkdsim.qrng import EntropyPool
+from qkdsim.schema import write_parquet
+from qkdsim.stream import simulate_until_decided
+from qkdsim.sweep import compare_protocols, compare_strategies, plot_sweep, run_sweep
+from qkdsim.viewer import VIEWS, highlight_styles, page_count, page_frame, view_rows
+
+st.set_page_config(page_title="QKD Simulation", layout="wide")
+st.title("QKD Simulation")
+
+# The results table renders one page of rows at a time
+PAGE_SIZES = [100, 500, 1000, 5000]
+# Larger runs are always streamed in blocks to keep memory flat
+IN_MEMORY_LIMIT = 10_000_000
+STREAM_BLOCK_SIZE = 1_000_000
+# Longer keys are shown truncated
+KEY_DISPLAY_BITS = 4096
+# Share of intercept-resent photons the sequential test treats as Eve
+SPRT_INTERCEPTED = 0.2
+# With sequential detection in-memory runs are simulated in blocks of this size so they can stop early
+SEQUENTIAL_BLOCK_SIZE = 10_000
 
 # --- Default values ---
-n = st.number_input("Number of photons (n)", min_value=1, max_value=10000, value=100, step=1)
+protocol = st.selectbox("Protocol", list(PROTOCOLS), format_func=lambda name: PROTOCOLS[name].label)
+if protocol == "e91":
+    st.caption("E91: n is the number of entangled pairs; equal analyzer settings form the key, "
+               "the others estimate the CHSH value.")
+n = st.number_input("Number of photons (n)", min_value=1, max_value=10_000_000_000, value=100, step=1)
 eve_on = st.checkbox("Enable Eve", value=False)
+eve = None
+if eve_on:
+    col_strategy, col_fraction, col_mu = st.columns(3)
+    with col_strategy:
+        eve_name = st.selectbox("Eve strategy", list(STRATEGY_LABELS), format_func=STRATEGY_LABELS.get)
+    pns = eve_name == "pns"
+    with col_fraction:
+        # For photon-number splitting only single-photon pulses are intercept-resent
+        eve_fraction = st.slider("Single-photon pulses intercepted" if pns else "Photons intercepted",
+                                 0.0, 1.0, 0.0 if pns else 1.0, step=0.05)
+    with col_mu:
+        eve_mu = st.number_input("Source mean photon number µ", min_value=0.001, value=0.5, step=0.05,
+                                 disabled=not pns)
+    eve = EveStrategy(eve_name, eve_fraction, eve_mu if pns else None)
 quantum_noise_prob = st.slider("Quantum noise probability", 0.0, 0.1, 0.02, step=0.01)
+seed = st.number_input("Seed (leave empty for a fresh random run)", min_value=0, value=None, step=1)
+streaming = st.checkbox("Streaming mode (bounded memory, no results table)", value=False)
+if n > IN_MEMORY_LIMIT and not streaming:
+    st.caption(f"Runs above {IN_MEMORY_LIMIT} photons use streaming mode.")
+    streaming = True
+sequential = st.checkbox("Sequential Eve detection (stop as soon as decided)", value=False)
+if sequential:
+    confidence = st.select_slider("Detection confidence", options=[0.9, 0.95, 0.99, 0.999], value=0.99)
+error_correction = st.checkbox("Error correction (Cascade)", value=True, disabled=streaming)
+privacy_amplification = st.checkbox("Privacy amplification (Toeplitz hash)", value=True,
+                                    disabled=streaming or not error_correction)
+
+# --- QRNG entropy pool ---
+@st.cache_resource
+def get_entropy_pool():
+    return EntropyPool()
+
+pool = get_entropy_pool()
 
-# --- QRNG API ---
 def get_quantum_bits(n):
-    try:
-        url = f"https://qrng.anu.edu.au/API/jsonI.php?length={n}&type=uint8"
-        r = requests.get(url, timeout=5)
-        if r.status_code == 200:
-            data = r.json()
-            if data["success"]:
-                return [x % 2 for x in data["data"]]
-    except:
-        pass
-    return [random.randint(0, 1) for _ in range(n)]
-
-# --- Helper: LED/bit truth table lookup ---
-def table_outcome(alice_angle_deg, bob_basis):
-    """
-    Return (led, outcome_bit or 'Random') according to the provided truth table.
-    bob_basis: 'rect' or 'diag'
-    """
-    # Use 0° for rectilinear lookup, 45° for diagonal lookup
-    bob_lookup = 0 if bob_basis == "rect" else 45
-
-    # Normalize Alice's diagonal 135° as -45° for the table keys
-    a = alice_angle_deg % 180
-    if a == 135:
-        a = -45
-
-    table = {
-        (-45, 0): ("Both", "Random"),
-        (-45, 45): ("Transmitted", 0),
-        (0, 0): ("Transmitted", 0),
-        (0, 45): ("Both", "Random"),
-        (45, 0): ("Both", "Random"),
-        (45, 45): ("Reflected", 1),
-        (90, 0): ("Reflected", 1),
-        (90, 45): ("Both", "Random"),
-    }
-    return table.get((a, bob_lookup), ("Both", "Random"))
+    # Served from the local pool without waiting on the network; Bob's random
+    # outcomes beyond the pooled bits are drawn from the simulation's PRNG
+    return pool.take_bits(n, fallback=False)
 
-# --- Simulation ---
-if st.button("Run simulation"):
-    quantum_bits = get_quantum_bits(n)
-    quantum_bit_index = 0
-    data = []
-
-    for _ in range(n):
-        # --- Alice ---
-        alice_basis = random.choice(["rect", "diag"])
-        alice_bit = random.choice([0, 1])
-
-        # IMPORTANT: Align Alice's encoding with the truth table
-        # rect: 0 -> 0°, 1 -> 90°  (already consistent)
-        # diag: 0 -> 135°(-45°), 1 -> 45° (swapped to match the table bit mapping)
-        alice_angle = {
-            ("rect", 0): 0,
-            ("rect", 1): 90,
-            ("diag", 0): 135,
-            ("diag", 1): 45,
-        }[(alice_basis, alice_bit)]
-
-        # --- Eve ---
-        if eve_on:
-            eve_basis = random.choice(["rect", "diag"])
-            eve_angle = random.choice([0, 45, 90, 135])
-            eve_same_basis = eve_basis == alice_basis
-            # If Eve uses same basis, she forwards Alice's bit; else effectively randomizes
-            eve_bit = alice_bit if eve_same_basis else random.choice([0, 1])
-            bit_sent_to_bob = eve_bit
-            basis_sent_to_bob = eve_basis
-            angle_sent_to_bob = eve_angle
-        else:
-            bit_sent_to_bob = alice_bit
-            basis_sent_to_bob = alice_basis
-            angle_sent_to_bob = alice_angle
-
-        # --- Bob ---
-        bob_basis = random.choice(["rect", "diag"])
-        bob_angle = {"rect": random.choice([0, 90]), "diag": random.choice([45, 135])}[bob_basis]
-
-        # Determine LED/bit outcome by the truth table using the photon reaching Bob
-        led, outcome = table_outcome(angle_sent_to_bob, bob_basis)
-
-        if outcome == "Random":
-            # For mismatched bases (per table), Bob's bit is random
-            bob_bit_pre_noise = quantum_bits[quantum_bit_index]
-            quantum_bit_index += 1
-            bob_note = f"{led} – random outcome"
-        else:
-            bob_bit_pre_noise = outcome
-            bob_note = f"{led} – deterministic outcome"
-
-        # Apply quantum noise (flip with given probability)
-        bob_bit = bob_bit_pre_noise
-        if random.random() < quantum_noise_prob:
-            bob_bit = 1 - bob_bit
-            bob_note += " + quantum noise"
-
-        bases_match = (basis_sent_to_bob == bob_basis)
-
-        data.append({
-            "Alice basis": alice_basis,
-            "Bob basis": bob_basis,
-            "Alice angle (°)": alice_angle,
-            "Photon to Bob (°)": angle_sent_to_bob,
-            "Bob angle (°)": bob_angle,
-            "Alice bit": alice_bit,
-            "Bob bit (pre-noise)": bob_bit_pre_noise,
-            "Bob bit": bob_bit,
-            "LED": led,
-            "Outcome": "Random" if outcome == "Random" else "Deterministic",
-            "Bases match": "Yes" if bases_match else "No",
-            "Bob note": bob_note
-        })
-
-    df = pd.DataFrame(data)
+# --- One-time-pad key pool ---
+@st.cache_resource
+def get_key_pool():
+    return KeyPool()
 
-    st.subheader("Simulation results")
+key_pool = get_key_pool()
 
-    def highlight_bases(val):
-        if val == "Yes":
-            return "background-color: lightgreen; font-weight: bold"
-        return ""
+# --- Cache of seeded runs ---
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
 
-    def highlight_mismatched_bits(row):
-        if row["Bases match"] == "Yes" and row["Alice bit"] != row["Bob bit"]:
-            return ['background-color: violet' if col == "Bob bit" else '' for col in row.index]
-        else:
-            return ['' for _ in row.index]
+result_cache = get_result_cache()
+
+# --- Profiling ---
+# One profiler per session; the breakdown of the last run is shown in the sidebar
+if "profiler" not in st.session_state:
+    st.session_state["profiler"] = Profiler()
+profiler = st.session_state["profiler"]
+profiler.enabled = st.sidebar.toggle("Profile runs", value=profiler.enabled,
+                                     help="Time every stage and sample peak memory; runs are appended "
+                                          f"to {profiler.log_path or 'memory only'} as JSON lines.")
+
+# --- Results table ---
+@st.fragment
+def show_results_table(result):
+    # Reruns on its own when the view or page changes, without re-simulating
+    st.subheader("Simulation results")
+    col_view, col_size, col_page = st.columns([2, 1, 1])
+    with col_view:
+        view = st.selectbox("Show", list(VIEWS), key="results_view")
+    with col_size:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key="results_page_size")
+    rows = view_rows(result, view)
+    total = result.n if rows is None else len(rows)
+    pages = page_count(total, page_size)
+    with col_page:
+        # Keyed by view and page size so the page resets when either changes
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key=f"results_page_{view}_{page_size}")
+    st.caption(f"{total} of {result.n} photons in this view.")
 
-    styled_df = df.style.map(highlight_bases, subset=["Bases match"])
-    styled_df = styled_df.apply(highlight_mismatched_bits, axis=1)
+    df = page_frame(result, rows, page, page_size)
+    styled_df = df.style.apply(highlight_styles, axis=None)
     st.dataframe(styled_df, use_container_width=True)
 
+    st.caption(f"Run held in {result.nbytes / result.n:.0f} bytes per photon.")
+    if st.button("Export run as Parquet"):
+        buffer = BytesIO()
+        write_parquet(result, buffer)
+        st.download_button(
+            "Download run (Parquet)",
+            data=buffer.getvalue(),
+            file_name="bb84_run.parquet",
+            mime="application/octet-stream"
+        )
+
+# --- Simulation ---
+if st.button("Run simulation"):
+    profiler.start("simulation", n=int(n), protocol=protocol, eve=eve.label if eve else None,
+                   noise_prob=quantum_noise_prob, seed=seed, streaming=streaming)
+    with profiler.stage("qrng"):
+        if seed is None:
+            quantum_bits = get_quantum_bits(n)
+        else:
+            # Seeded runs take Bob's random outcomes from his PRNG stream so they can be reproduced
+            quantum_bits = np.empty(0, dtype=np.uint8)
+    streams = RoleStreams.from_seed(seed)
+    detector = None
+    if sequential:
+        # Null and alternative error rates of the chosen protocol, without and with Eve
+        detector = SequentialTest(PROTOCOLS[protocol].expected_qber(quantum_noise_prob),
+                                  PROTOCOLS[protocol].expected_qber(quantum_noise_prob, SPRT_INTERCEPTED),
+                                  alpha=1 - confidence, beta=1 - confidence)
+    if streaming:
+        progress = st.progress(0.0, text="Simulating...")
+        with profiler.stage("simulate (streaming)"):
+            for stats in run_streaming(int(n), eve_on, quantum_noise_prob, block_size=STREAM_BLOCK_SIZE,
+                                       rng=streams, quantum_bits=quantum_bits, detector=detector, eve=eve,
+                                       protocol=protocol):
+                progress.progress(stats.progress,
+                                  text=f"{stats.photons} / {n} photons — running QBER {stats.qber:.2%}")
+        num_matches, mismatches = stats.sifted, stats.errors
+        random_outcomes = stats.random_outcomes
+        chsh = stats.chsh
+        photons = stats.photons
+    else:
+        with profiler.stage("simulate"):
+            if detector is not None:
+                result = simulate_until_decided(int(n), detector, eve_on, quantum_noise_prob,
+                                                block_size=SEQUENTIAL_BLOCK_SIZE, rng=streams,
+                                                quantum_bits=quantum_bits, eve=eve, protocol=protocol)
+            elif seed is None:
+                result = simulate(int(n), eve_on, quantum_noise_prob, rng=streams, quantum_bits=quantum_bits,
+                                  eve=eve, protocol=protocol)
+            else:
+                hits = result_cache.hits
+                result = cached_simulate(result_cache, int(n), eve_on, quantum_noise_prob, int(seed), eve,
+                                         protocol)
+                if result_cache.hits > hits:
+                    st.caption(f"Run with seed {seed} loaded from cache.")
+        num_matches, mismatches = result.num_matches, result.errors
+        random_outcomes = result.fair_outcomes
+        chsh = result.chsh
+        photons = result.n
+        with profiler.stage("results table"):
+            show_results_table(result)
+
     # --- Statistics ---
     st.subheader("Results analysis")
 
-    # Only matching bases contribute to the sifted key
-    matching_bases = df[df["Bases match"] == "Yes"]
-    num_matches = len(matching_bases)
-
-    # Correct means Alice bit == Bob bit (after noise) when bases match
-    correct = (matching_bases["Alice bit"] == matching_bases["Bob bit"]).sum()
-    mismatches = num_matches - correct
+    # Only matching bases contribute to the sifted key;
+    # correct means Alice bit == Bob bit (after noise) when bases match
+    correct = num_matches - mismatches
+    quantum_used = min(random_outcomes, len(quantum_bits))
+    pool.record_fallback(random_outcomes - quantum_used)
+    # Bob only used the bits of his random outcomes; the rest go back to the pool
+    pool.return_bits(quantum_bits[quantum_used:])
 
     st.markdown(f"""
-- **Number of matching bases:** `{num_matches} / {n}`
+- **Sifted bits ({'conclusive results' if protocol == 'b92' else 'matching bases'}):** `{num_matches} / {photons}`
 - **Correctly received bits:** `{correct} / {num_matches if num_matches else 1}`
 - **Mismatched bits:** `{mismatches} / {num_matches if num_matches else 1}`
+- **Random outcomes from QRNG:** `{quantum_used} / {random_outcomes}` (rest pseudo-random)
 """)
 
     if num_matches > 0:
         mismatch_rate = mismatches / num_matches
         st.markdown(f"- **Mismatch rate (QBER on sifted key):** `{mismatch_rate:.2%}`")
 
-        # Expected error ~ quantum_noise_prob (since only matching bases are kept)
-        expected_rate = quantum_noise_prob
+        if chsh is not None:
+            st.markdown(f"- **CHSH value S:** `{chsh:.3f}` (2√2 ≈ 2.828 for ideal pairs, ≤ 2 if the pairs "
+                        f"were measured on the way)")
+
+        # Error rate the configured noise alone gives on the sifted key of this protocol
+        expected_rate = PROTOCOLS[protocol].expected_qber(quantum_noise_prob)
         tolerance_warn = 0.02  # 2% over expected -> warn
         tolerance_alert = 0.05  # 5% over expected -> alert
 
+        if eve_on and not streaming:
+            st.markdown(f"- **Sifted key known to Eve ({eve.label}):** `{result.eve_knowledge:.2%}`")
+
         if mismatch_rate > expected_rate + tolerance_alert:
             st.error(f"Observed error exceeds noise by >{tolerance_alert:.0%} — possible Eve!")
         elif mismatch_rate > expected_rate + tolerance_warn:
@@ -179,13 +231,243 @@ if st.button("Run simulation"):
     else:
         st.info("Not enough matches for analysis.")
 
+    if detector is not None:
+        if detector.decision is None:
+            st.info(f"Sequential test undecided after {detector.samples} sifted bits.")
+        else:
+            verdict = "Eve detected" if detector.decision == EVE else "noise only"
+            st.markdown(f"- **Sequential test:** `{verdict}` after `{detector.detection_photons}` photons "
+                        f"(`{detector.samples}` sifted bits, confidence `{confidence:.1%}`)")
+            if photons < n:
+                st.caption(f"Run stopped early after {photons} of {n} photons.")
+
+    # --- Error correction ---
+    if error_correction and not streaming and num_matches > 0:
+        st.subheader("Error correction (Cascade)")
+        with profiler.stage("cascade"):
+            # Alice and Bob only know the QBER of a disclosed sample, which is then dropped from the key
+            qber_estimate, keep = estimate_qber(result.sifted_key(), result.sifted_key("bob"), rng=streams.public)
+            cascade = reconcile(result.sifted_key()[keep], result.sifted_key("bob")[keep], qber_estimate,
+                                rng=streams.public)
+        st.markdown(f"""
+- **Estimated QBER:** `{qber_estimate:.2%}` from `{num_matches - len(cascade.key)}` disclosed sifted bits
+- **Passes:** `{cascade.passes}` (block sizes `{cascade.block_sizes}`)
+- **Corrected bits:** `{cascade.corrected}`
+- **Leaked parity bits:** `{cascade.leaked_bits}`
+- **Remaining errors:** `{cascade.residual_errors}`
+- **Throughput:** `{cascade.throughput:,.0f}` reconciled bits/s
+""")
+
+    # --- Privacy amplification ---
+    final_key = None
+    if privacy_amplification and error_correction and not streaming and num_matches > 0:
+        st.subheader("Privacy amplification")
+        if cascade.residual_errors:
+            # Alice's and Bob's keys still differ: hashing them would give two different keys
+            st.warning(f"Cascade left {cascade.residual_errors} errors — no secret key is extracted and the "
+                       f"sifted key is kept instead.")
+        else:
+            with profiler.stage("privacy amplification"):
+                amplified = amplify(cascade.key, qber_estimate, cascade.leaked_bits, rng=streams.public)
+            st.markdown(f"""
+- **Reconciled key:** `{amplified.input_bits}` bits
+- **Final secret key:** `{amplified.output_bits}` bits
+- **Hashing time:** `{amplified.seconds:.3f}` s (`{amplified.throughput:,.0f}` bits/s)
+""")
+            if amplified.output_bits:
+                final_key = amplified.key
+            else:
+                st.warning("Key too short or too noisy to extract a secret key — the sifted key is kept instead.")
+
     # --- Shared key ---
     # Save only when Eve is off
     if not eve_on:
-        shared_key = matching_bases["Alice bit"].tolist()
-        st.session_state["shared_key"] = shared_key
+        if final_key is not None:
+            shared_key = final_key
+        else:
+            shared_key = PackedKey.from_bits(stats.key_tail if streaming else result.sifted_key())
+        # Only fresh, amplified keys enter the pool: seeded runs (and cache hits) repeat their key
+        deposit = seed is None and final_key is not None
+        if deposit:
+            deposited = key_pool.deposit(shared_key)
+            # A pooled key is not kept in the session, so the manual key path cannot use its bytes again
+            st.session_state.pop("shared_key", None)
+        else:
+            st.session_state["shared_key"] = shared_key
         st.subheader("Shared key")
-        st.code("".join(map(str, shared_key)), language="text")
-        st.info("Key will be used for encryption.")
+        st.code(shared_key.to_bitstring(KEY_DISPLAY_BITS), language="text")
+        if len(shared_key) > KEY_DISPLAY_BITS:
+            st.caption(f"Showing the first {KEY_DISPLAY_BITS} of {len(shared_key)} bits "
+                       f"({shared_key.nbytes} bytes packed).")
+        if streaming:
+            st.caption(f"Streaming mode keeps only the last {len(shared_key)} sifted bits.")
+        if deposit:
+            st.info(f"Key will be used for encryption: {deposited} bytes deposited into the key pool "
+                    f"({key_pool.available:,} unused bytes).")
+        else:
+            reason = "seeded runs repeat their key" if seed is not None else "it was not privacy-amplified"
+            st.info(f"Key not deposited into the key pool ({reason}); it is kept as the manual key of this "
+                    f"session.")
     else:
         st.info("Eve is enabled — key not saved.")
+    profiler.flush()
+
+# --- Parameter sweep ---
+st.divider()
+with st.expander("Parameter sweep (QBER vs. noise)"):
+    col_noise, col_eve, col_n = st.columns(3)
+    with col_noise:
+        noise_range = st.slider("Noise range", 0.0, 0.1, (0.0, 0.1), step=0.01)
+        noise_steps = st.number_input("Noise steps", min_value=2, max_value=101, value=11, step=1)
+    with col_eve:
+        eve_options = st.multiselect("Eve settings", ["Off", "On"], default=["Off", "On"])
+        sweep_seed = st.number_input("Seed", min_value=0, value=0, step=1)
+    with col_n:
+        photon_counts_str = st.text_input("Photon counts (comma separated)", value="100000")
+
+    if st.button("Run sweep"):
+        try:
+            # Counts may be written like 1e6 but must be whole numbers: 1.5 is rejected, not rounded
+            values = [float(x) for x in photon_counts_str.replace(" ", "").split(",") if x]
+            photon_counts = [int(v) for v in values] if all(v.is_integer() for v in values) else None
+        except (ValueError, OverflowError):
+            photon_counts = None
+        if photon_counts is None or any(count < 1 for count in photon_counts):
+            st.error(f"Photon counts must be positive whole numbers separated by commas, e.g. 100000, 1e6 "
+                     f"(got {photon_counts_str!r}).")
+        elif not eve_options or not photon_counts:
+            st.warning("Select at least one Eve setting and one photon count.")
+        else:
+            noise_values = np.linspace(noise_range[0], noise_range[1], int(noise_steps))
+            with st.spinner("Running sweep on all cores..."):
+                df_sweep = run_sweep(noise_values, [opt == "On" for opt in eve_options],
+                                     photon_counts, seed=int(sweep_seed), protocol=protocol)
+            st.pyplot(plot_sweep(df_sweep))
+            st.dataframe(df_sweep, use_container_width=True)
+            st.download_button(
+                "Download sweep results (CSV)",
+                data=df_sweep.to_csv(index=False).encode("utf-8"),
+                file_name="qber_sweep.csv",
+                mime="text/csv"
+            )
+
+# --- Eve strategy comparison ---
+with st.expander("Compare Eve strategies"):
+    col_cmp_n, col_cmp_fraction, col_cmp_mu = st.columns(3)
+    with col_cmp_n:
+        compare_n = st.number_input("Photons per strategy", min_value=1000, max_value=100_000_000,
+                                    value=1_000_000, step=100_000)
+        compare_seed = st.number_input("Seed ", min_value=0, value=0, step=1)
+    with col_cmp_fraction:
+        partial_fraction = st.slider("Partial intercept-resend share", 0.05, 1.0, 0.5, step=0.05)
+    with col_cmp_mu:
+        compare_mu = st.number_input("PNS source µ", min_value=0.001, value=0.5, step=0.05)
+
+    if st.button("Compare strategies"):
+        strategies = [
+            EveStrategy("intercept_resend"),
+            EveStrategy("intercept_resend", partial_fraction),
+            EveStrategy("breidbart"),
+            EveStrategy("breidbart", partial_fraction),
+            EveStrategy("pns", 0.0, compare_mu),
+            EveStrategy("random_angle"),
+        ]
+        with st.spinner("Attacking the same photons with every strategy..."):
+            df_eve = compare_strategies(strategies, int(compare_n), quantum_noise_prob, seed=int(compare_seed),
+                                        protocol=protocol)
+        st.dataframe(df_eve.style.format({"intercepted": "{:.1%}", "qber": "{:.2%}",
+                                          "eve_knowledge": "{:.2%}", "seconds": "{:.2f}"}),
+                     use_container_width=True)
+        st.caption("QBER is measured on the sifted key, Eve's knowledge is the share of sifted bits she holds.")
+
+# --- Protocol comparison ---
+with st.expander("Compare protocols at equal photon budget"):
+    col_proto, col_proto_n = st.columns([2, 1])
+    with col_proto:
+        compare_names = st.multiselect("Protocols", list(PROTOCOLS), default=list(PROTOCOLS),
+                                       format_func=lambda name: PROTOCOLS[name].label)
+    with col_proto_n:
+        budget = st.number_input("Photons per protocol", min_value=1000, max_value=1_000_000_000,
+                                 value=1_000_000, step=100_000)
+        budget_seed = st.number_input("Seed  ", min_value=0, value=0, step=1)
+
+    if st.button("Compare protocols") and compare_names:
+        with st.spinner("Running every protocol on all cores..."):
+            df_protocols = compare_protocols(compare_names, int(budget), eve_on, quantum_noise_prob,
+                                             seed=int(budget_seed))
+        st.dataframe(df_protocols.style.format({"sift_rate": "{:.1%}", "qber": "{:.2%}", "chsh": "{:.3f}",
+                                                "seconds": "{:.2f}", "photons_per_second": "{:,.0f}"},
+                                               na_rep="–"),
+                     use_container_width=True)
+
+# --- Physical channel ---
+with st.expander("Physical channel model (loss, detectors, dark counts)"):
+    col_link, col_det, col_src = st.columns(3)
+    with col_link:
+        pulses = st.number_input("Pulses sent", min_value=1, max_value=10**13, value=10**9, step=10**6)
+        distance_km = st.number_input("Distance (km)", min_value=0.0, value=50.0, step=5.0)
+        attenuation = st.number_input("Attenuation (dB/km)", min_value=0.0, value=0.2, step=0.01)
+        extra_loss = st.number_input("Extra loss (dB)", min_value=0.0, value=0.0, step=1.0)
+    with col_det:
+        detector_efficiency = st.slider("Detector efficiency", 0.01, 1.0, 0.1, step=0.01)
+        dark_count_rate = st.number_input("Dark count rate (counts/s)", min_value=0.0, value=100.0, step=10.0)
+        gate_ns = st.number_input("Gate window (ns)", min_value=0.01, value=1.0, step=0.1)
+        dead_time_us = st.number_input("Dead time (µs)", min_value=0.0, value=1.0, step=0.1)
+    with col_src:
+        pulse_rate_mhz = st.number_input("Pulse rate (MHz)", min_value=0.001, value=1000.0, step=10.0)
+        poisson_source = st.checkbox("Attenuated laser (Poisson) source", value=False)
+        mean_photon_number = st.number_input("Mean photon number µ", min_value=0.001, value=0.1, step=0.05,
+                                             disabled=not poisson_source)
+
+    if st.button("Run channel simulation"):
+        channel = ChannelModel(
+            distance_km=distance_km,
+            attenuation_db_per_km=attenuation,
+            extra_loss_db=extra_loss,
+            detector_efficiency=detector_efficiency,
+            dark_count_rate=dark_count_rate,
+            gate_window=gate_ns * 1e-9,
+            dead_time=dead_time_us * 1e-6,
+            pulse_rate=pulse_rate_mhz * 1e6,
+            mean_photon_number=mean_photon_number if poisson_source else None,
+        )
+        with st.spinner("Simulating detected photons..."):
+            ch = simulate_channel(int(pulses), channel, eve_on, quantum_noise_prob, rng=seed, eve=eve,
+                                  protocol=protocol)
+        st.markdown(f"""
+- **Total loss:** `{channel.loss_db:.1f} dB` (click probability per pulse `{channel.click_probability:.3e}`)
+- **Simulated link time:** `{ch.link_seconds:.3g} s`
+- **Detections:** `{ch.detections}` (lost to dead time: `{ch.dead_time_losses}`, dark counts: `{ch.dark_counts}`)
+- **Raw key rate:** `{ch.raw_rate:,.1f}` bits/s
+- **Sifted key rate:** `{ch.sifted_rate:,.1f}` bits/s
+- **QBER:** `{ch.qber:.2%}`
+- **Computation time:** `{ch.seconds:.3f} s`
+""")
+
+# --- QRNG pool status ---
+pool_stats = pool.stats()
+st.sidebar.subheader("QRNG entropy pool")
+st.sidebar.markdown(f"""
+- **Available bits:** `{pool_stats['available_bits']}`
+- **Quantum bits served:** `{pool_stats['quantum_bits_served']}`
+- **Fallback bits:** `{pool_stats['fallback_bits_served']}`
+- **Refilling:** `{'yes' if pool_stats['refilling'] else 'no'}`
+""")
+if pool_stats["last_error"]:
+    st.sidebar.caption(f"Last refill error: {pool_stats['last_error']}")
+
+render_sidebar(st, profiler)
+
+key_pool_stats = key_pool.stats()
+st.sidebar.subheader("Key pool")
+st.sidebar.markdown(f"""
+- **Unused key:** `{key_pool_stats['available_bytes']:,}` bytes
+- **Consumed / deposited:** `{key_pool_stats['consumed_bytes']:,}` / `{key_pool_stats['deposited_bytes']:,}` bytes
+""")
+
+cache_stats = result_cache.stats()
+st.sidebar.subheader("Run cache")
+st.sidebar.markdown(f"""
+- **Cached runs:** `{cache_stats['entries']}` (`{cache_stats['bytes'] / 1e6:.1f}` MB)
+- **Hits / misses:** `{cache_stats['hits']}` / `{cache_stats['misses']}`
+""")
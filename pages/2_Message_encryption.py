@@ -1,5 +1,21 @@
+import hashlib
+import os
+import tempfile
+import weakref
+from pathlib import Path
+
 import streamlit as st
-import pandas as pd
+
+from qkdsim.key import PackedKey
+from qkdsim.keypool import CiphertextMismatchError, InsufficientKeyError, KeyPool
+from qkdsim.otp import bit_table, decrypt_text, encrypt_text, key_bytes, key_stream, stream_digest, xor_stream
+
+# Longer keys are used as-is instead of being loaded into the text area
+KEY_EDIT_LIMIT = 65536
+# Longer ciphertexts are shown truncated (the download has all of it)
+DISPLAY_BYTES = 4096
+# The bit-by-bit explanation shows a window of this many characters (bytes) at a time
+WINDOW_SIZES = [8, 64, 256, 1024]
 
 def remove_accents(text):
     replacements = {
@@ -16,65 +32,211 @@ st.set_page_config(page_title="Key Usage")
 
 st.title("Using the Key for Message Encryption")
 
-if "shared_key" not in st.session_state or not st.session_state["shared_key"]:
+# --- Key pool ---
+@st.cache_resource
+def get_key_pool():
+    return KeyPool()
+
+key_pool = get_key_pool()
+
+shared_key = st.session_state.get("shared_key") or PackedKey()
+pool_stats = key_pool.stats()
+if not shared_key and not pool_stats["available_bytes"]:
     st.warning("Please first run the simulation in the 'BB84 – Simulation' tab to obtain the key.")
-    default_key_str = ""
+
+source = st.radio("Key source", ["Key pool", "Manual key"], horizontal=True)
+if source == "Key pool":
+    st.caption(f"Every encryption consumes fresh key bytes from the pool and a key byte is never used twice. "
+               f"Unused: {pool_stats['available_bytes']:,} bytes, consumed: {pool_stats['consumed_bytes']:,} "
+               f"of {pool_stats['deposited_bytes']:,} bytes deposited by simulation runs.")
+    key = None
+elif len(shared_key) > KEY_EDIT_LIMIT:
+    st.caption(f"Using the shared key of {len(shared_key)} bits ({shared_key.nbytes} bytes), "
+               f"hex: `{shared_key[:256].hex()}…`")
+    key = shared_key
 else:
-    default_key_str = ''.join(str(b) for b in st.session_state["shared_key"])
+    edited_key = st.text_area("Manual input/edit key (bits 0 and 1)", value=shared_key.to_bitstring(), height=100)
+    key = PackedKey.from_bitstring(edited_key)
+
+if key is not None:
+    # Bytes of each manual key already used in this session, by key digest
+    manual_used = st.session_state.setdefault("manual_key_used", {})
+    # (length, SHA-256) of the ciphertext encrypted at each (key digest, offset)
+    manual_ciphertexts = st.session_state.setdefault("manual_key_ciphertexts", {})
+    key_id = hashlib.sha256(key_bytes(key).tobytes()).hexdigest()
+    st.caption(f"Every encryption continues where the previous one with this key stopped; the key is never "
+               f"reused or stretched. Used: {manual_used.get(key_id, 0):,} of {len(key) // 8:,} bytes.")
+
+
+def encryption_key(nbytes: int):
+    """Key bytes for ``nbytes`` of plaintext and their offset; the bytes are consumed and never handed out again."""
+    if key is None:
+        offset = key_pool.reserve(nbytes)
+        return key_pool.key_at(offset, nbytes), offset
+    offset = manual_used.get(key_id, 0)
+    used_key = key_stream(key, nbytes, offset)
+    manual_used[key_id] = offset + nbytes
+    return used_key, offset
+
+
+def bind_ciphertext(offset: int, nbytes: int, digest: str):
+    """Tie the key bytes at ``offset`` to the ciphertext they encrypted, so they decrypt nothing else."""
+    if key is None:
+        key_pool.bind(offset, nbytes, digest)
+    else:
+        manual_ciphertexts[(key_id, offset)] = (nbytes, digest)
+
+
+def decryption_key(nbytes: int, offset: int, digest: str):
+    """Key bytes at ``offset`` for the ciphertext with SHA-256 ``digest``; any other upload is refused."""
+    if key is None:
+        return key_pool.key_for(offset, nbytes, digest)
+    if manual_ciphertexts.get((key_id, offset)) != (nbytes, digest):
+        raise CiphertextMismatchError(f"This is not the ciphertext encrypted with the manual key at offset {offset}")
+    return key_stream(key, nbytes, offset)
+
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class TempOutput:
+    """Temporary output file, deleted when replaced, when the session state is discarded or at exit."""
+
+    def __init__(self, suffix: str):
+        fd, self.path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        self.remove = weakref.finalize(self, remove_file, self.path)
+
+
+@st.fragment
+def show_bit_table(plaintext: bytes, ciphertext: bytes):
+    # Reruns on its own when the window moves; only the window's bits are unpacked
+    st.markdown("### 🧠 Bit-by-bit explanation")
+    col_first, col_size = st.columns(2)
+    with col_size:
+        window = st.selectbox("Characters per window", WINDOW_SIZES, index=1, key="explain_window")
+    with col_first:
+        first = st.number_input(f"First character (of {len(plaintext)})", min_value=0,
+                                max_value=max(len(plaintext) - 1, 0), value=0, step=window,
+                                key=f"explain_first_{window}")
+    stop = min(first + window, len(plaintext))
+    st.dataframe(bit_table(plaintext, ciphertext, first * 8, stop * 8), hide_index=True,
+                 use_container_width=True)
 
-edited_key = st.text_area("Manual input/edit key (bits 0 and 1)", value=default_key_str, height=100)
 
 with st.form("encryption_form"):
-    message = st.text_input("Message (ASCII characters)", value="hello")
+    message = st.text_area("Message (ASCII characters)", value="hello", height=68)
+    explain = st.checkbox("Show bit-by-bit explanation", value=True)
     submit = st.form_submit_button("Use key")
 
 if submit:
-    edited_key = ''.join([c for c in edited_key if c in ['0', '1']])
-    if not edited_key:
-        st.warning("Please enter at least one bit of key for encryption.")
+    # Update the message by removing accented characters
+    message_no_accents = remove_accents(message)
+    try:
+        used_key, offset = encryption_key(len(message_no_accents.encode("utf-8")))
+    except InsufficientKeyError as e:
+        st.error(f"Not enough key for this message: {e}. Run the simulation again to generate more key.")
     else:
-        # Update the message by removing accented characters
-        message_no_accents = remove_accents(message)
-
-        message_bits = ''.join(format(ord(ch), '08b') for ch in message_no_accents)
-        repeated_key = edited_key * ((len(message_bits) // len(edited_key)) + 1)
-        key_bits = repeated_key[:len(message_bits)]
-
-        encrypted_bits = ''
-        analysis = []
-
-        for i in range(len(message_bits)):
-            m_bit = int(message_bits[i])
-            k_bit = int(key_bits[i])
-            xor_bit = m_bit ^ k_bit
-            encrypted_bits += str(xor_bit)
-
-            explanation = "Same bits → result 0" if m_bit == k_bit else "Different bits → result 1"
-
-            analysis.append({
-                "Position": i,
-                "Message bit": m_bit,
-                "Key bit": k_bit,
-                "XOR result": xor_bit,
-                "Explanation": explanation
-            })
-
-        try:
-            encrypted_chars = ''.join(
-                chr(int(encrypted_bits[i:i+8], 2)) for i in range(0, len(encrypted_bits), 8)
-            )
-        except:
-            encrypted_chars = "(Invalid ASCII string)"
+        ciphertext = encrypt_text(message_no_accents, used_key)
+        bind_ciphertext(offset, len(ciphertext), hashlib.sha256(ciphertext).hexdigest())
+        st.session_state["ciphertext"] = ciphertext
+        st.session_state["ciphertext_offset"] = offset
 
         st.markdown("### 🔐 Encrypted message")
-        st.code(encrypted_chars, language="text")
+        st.code(ciphertext[:DISPLAY_BYTES].decode("latin-1"), language="text")
+        if len(ciphertext) > DISPLAY_BYTES:
+            st.caption(f"Showing the first {DISPLAY_BYTES} of {len(ciphertext)} bytes.")
+        st.caption(f"Used key bytes {offset:,}–{offset + len(ciphertext):,} of the "
+                   f"{'pool' if key is None else 'manual key'}; decrypt with key offset {offset}.")
+        st.download_button("Download ciphertext", data=ciphertext, file_name="message.bin",
+                           mime="application/octet-stream")
 
-        st.markdown("### 🧠 Bit-by-bit explanation")
-        df_analysis = pd.DataFrame(analysis)
-        st.dataframe(df_analysis, use_container_width=True)
+        if explain:
+            show_bit_table(message_no_accents.encode("utf-8"), ciphertext)
 
         st.markdown("---")
         st.info(
             "Each character is converted to an 8-bit binary form. Bit by bit encryption is done using the key "
             "via XOR operation. Result 0 means bits are the same, 1 means bits are different."
         )
+
+# --- Decryption ---
+st.markdown("### 🔓 Decrypt")
+last_ciphertext = st.session_state.get("ciphertext", b"")
+with st.form("decryption_form"):
+    ciphertext_hex = st.text_area("Ciphertext (hex)",
+                                  value=last_ciphertext.hex() if len(last_ciphertext) <= DISPLAY_BYTES else "",
+                                  height=68)
+    ciphertext_file = st.file_uploader("…or upload a downloaded ciphertext", type=["bin"])
+    decrypt_offset = st.number_input("Key offset (bytes)", min_value=0,
+                                     value=st.session_state.get("ciphertext_offset", 0), step=1)
+    decrypt = st.form_submit_button("Decrypt with key")
+
+if decrypt:
+    try:
+        ciphertext = ciphertext_file.getvalue() if ciphertext_file else bytes.fromhex(ciphertext_hex)
+        digest = hashlib.sha256(ciphertext).hexdigest()
+        plaintext = decrypt_text(ciphertext, decryption_key(len(ciphertext), int(decrypt_offset), digest))
+    except InsufficientKeyError as e:
+        st.error(f"No key for this ciphertext: {e}.")
+    except CiphertextMismatchError as e:
+        st.error(f"{e}; only that ciphertext can be decrypted with these key bytes.")
+    except ValueError:
+        st.error("The ciphertext is not valid hex.")
+    else:
+        st.code(plaintext[:DISPLAY_BYTES], language="text")
+        if len(plaintext) > DISPLAY_BYTES:
+            st.caption(f"Showing the first {DISPLAY_BYTES} of {len(plaintext)} characters.")
+
+# --- File encryption ---
+st.markdown("### 📁 File encryption")
+st.caption("Files are XORed with the key chunk by chunk into a temporary file, so memory use does not grow "
+           "with the file size. Decrypting XORs again with the same key bytes, given by their offset.")
+with st.form("file_form"):
+    upload = st.file_uploader("File to encrypt or decrypt")
+    mode = st.radio("Mode", ["Encrypt", "Decrypt"], horizontal=True)
+    file_offset = st.number_input("Key offset for decryption (bytes)", min_value=0, value=0, step=1)
+    process_file = st.form_submit_button("Process file")
+
+if process_file and upload is not None:
+    # Replace the previous output of this session
+    previous = st.session_state.pop("file_output", None)
+    if previous:
+        previous["output"].remove()
+    try:
+        if mode == "Encrypt":
+            pad, offset = encryption_key(upload.size)
+            out_name = f"{upload.name}.enc"
+        else:
+            offset = int(file_offset)
+            pad = decryption_key(upload.size, offset, stream_digest(upload))
+            upload.seek(0)
+            out_name = upload.name[:-4] if upload.name.endswith(".enc") else f"{upload.name}.dec"
+    except InsufficientKeyError as e:
+        st.error(f"Not enough key for this file: {e}.")
+    except CiphertextMismatchError as e:
+        st.error(f"{e}; only that file can be decrypted with these key bytes.")
+    else:
+        output = TempOutput(".otp")
+        with open(output.path, "wb") as dst:
+            file_stats = xor_stream(upload, dst, pad)
+        if mode == "Encrypt":
+            with open(output.path, "rb") as src:
+                bind_ciphertext(offset, file_stats.nbytes, stream_digest(src))
+        st.session_state["file_output"] = {"output": output, "name": out_name, "stats": file_stats,
+                                           "offset": offset}
+
+file_output = st.session_state.get("file_output")
+if file_output and os.path.exists(file_output["output"].path):
+    file_stats = file_output["stats"]
+    st.markdown(f"- **Processed:** `{file_stats.nbytes:,}` bytes in `{file_stats.chunks}` chunks, "
+                f"`{file_stats.seconds:.3f}` s (`{file_stats.mb_per_second:,.1f}` MB/s)")
+    st.markdown(f"- **Key offset:** `{file_output['offset']}`")
+    # Read from disk only when the download is requested
+    st.download_button(f"Download {file_output['name']}",
+                       data=Path(file_output["output"].path).read_bytes,
+                       file_name=file_output["name"], mime="application/octet-stream")
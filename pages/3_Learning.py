@@ -3,6 +3,9 @@ import streamlit as st
 import pandas as pd
 import random
 
+from qkdsim.optics import OUTCOME_LUT, RANDOM, state_code
+from qkdsim.protocols import PROTOCOLS
+
 st.set_page_config(page_title="Learning – BB84", layout="wide")
 st.title("Learning")
 
@@ -16,18 +19,14 @@ Your task: for each row, enter what **Bob’s bit** would be in the ideal case.
 # -------------------------- Data generation --------------------------
 POLARIZATIONS = [-45, 0, 45, 90]
 BASIS = [0, 45]
+BB84 = PROTOCOLS["bb84"]
+
+def expected_bit(alice_angle, bob_angle):
+    # Same measurement table the simulation uses; Bob's 0° is the rect basis, 45° the diag basis
+    outcome = OUTCOME_LUT[state_code(alice_angle), BB84.bob_axes[BASIS.index(bob_angle)]]
+    return "r" if outcome == RANDOM else str(outcome)
 
-# Map to expected bit based on your table
-EXPECTED_TABLE = {
-    (-45, 0): "r",
-    (-45, 45): "0",
-    (0, 0): "0",
-    (0, 45): "r",
-    (45, 0): "r",
-    (45, 45): "1",
-    (90, 0): "1",
-    (90, 45): "r",
-}
+EXPECTED_TABLE = {(a, b): expected_bit(a, b) for a in POLARIZATIONS for b in BASIS}
 
 def generate_exercise(n: int):
     items = []
@@ -0,0 +1,17 @@
+"""Importable QKD simulation core used by the Streamlit pages."""
+from qkdsim.engine import RoleStreams, SimulationResult, simulate, table_outcome
+from qkdsim.eve import EveStrategy
+from qkdsim.key import PackedKey
+from qkdsim.stream import RunningStats, run_streaming, simulate_blocks
+
+__all__ = [
+    "EveStrategy",
+    "PackedKey",
+    "RoleStreams",
+    "RunningStats",
+    "SimulationResult",
+    "run_streaming",
+    "simulate",
+    "simulate_blocks",
+    "table_outcome",
+]
@@ -0,0 +1,3 @@
+from qkdsim.cli import main
+
+main()
@@ -0,0 +1,75 @@
+"""LRU cache of completed simulation runs.
+
+Seeded runs are deterministic, so a run keyed by ``(n, eve_on, noise_prob,
+seed, eve, protocol)`` can be handed back instead of recomputed, e.g. on Streamlit reruns or
+repeated demos. The cache is bounded by the memory held by the cached arrays.
+"""
+import threading
+from collections import OrderedDict
+
+from typing import Optional
+
+from qkdsim.engine import SimulationResult, simulate
+from qkdsim.eve import EveStrategy
+from qkdsim.protocols import ProtocolLike, get_protocol
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResultCache:
+    """Least-recently-used cache of :class:`SimulationResult` with a byte cap."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            result = self._items.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result: SimulationResult):
+        size = result.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key).nbytes
+            self._items[key] = result
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses}
+
+
+def cached_simulate(cache: ResultCache, n: int, eve_on: bool, noise_prob: float, seed: int,
+                    eve: Optional[EveStrategy] = None, protocol: ProtocolLike = "bb84") -> SimulationResult:
+    """:func:`simulate` with a fixed seed, served from ``cache`` when possible."""
+    eve = (eve or EveStrategy()) if eve_on else None
+    protocol = get_protocol(protocol).name
+    key = (int(n), bool(eve_on), float(noise_prob), int(seed), eve, protocol)
+    result = cache.get(key)
+    if result is None:
+        result = simulate(n, eve_on, noise_prob, rng=seed, eve=eve, protocol=protocol)
+        cache.put(key, result)
+    return result
@@ -0,0 +1,227 @@
+"""Headless batch runner for the QKD simulation.
+
+Runs the same engine as the Simulation page without Streamlit and writes one
+summary row per run (JSON and Parquet), optionally with the full per-photon
+trace of each run as Parquet. Every combination of ``--protocol``, ``--n``,
+``--eve`` and ``--noise`` is run ``--repeats`` times with consecutive seeds::
+
+    python -m qkdsim --protocol bb84 e91 --n 1000000 100000000 --eve both \\
+        --noise 0 0.02 0.05 --seed 1 --repeats 3 --workers 4 --out campaign/
+
+A batch can also be read from a JSON list or CSV with the columns
+``n, eve_on, noise_prob, seed`` via ``--batch``. Eve attacks with
+``--eve-strategy`` (see :mod:`qkdsim.eve`); batch files may set
+``protocol``, ``eve_strategy``, ``eve_fraction`` and ``mean_photon_number``
+per run. With ``--key-pool`` every block of a run without Eve is reconciled
+(Cascade) and privacy-amplified, and the final key is deposited into that
+:class:`~qkdsim.keypool.KeyPool` file, which the encryption page can share.
+Seeded runs reproduce their keys, so ``--key-pool`` refuses ``--seed`` and
+batch files with a ``seed`` column.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from qkdsim.cascade import estimate_qber, reconcile
+from qkdsim.engine import RoleStreams
+from qkdsim.eve import STRATEGIES, EveStrategy
+from qkdsim.keypool import KeyPool
+from qkdsim.privacy import amplify
+from qkdsim.protocols import PROTOCOLS
+from qkdsim.schema import to_arrow
+from qkdsim.stream import RunningStats, simulate_blocks
+
+# Runs up to this size are simulated in one block, identical to a seeded run on the page
+DEFAULT_BLOCK_SIZE = 10_000_000
+SUMMARY_COLUMNS = ["run", "protocol", "n", "eve_on", "eve_strategy", "eve_fraction", "mean_photon_number",
+                   "noise_prob", "seed", "sifted", "errors", "qber", "chsh", "seconds", "photons_per_second",
+                   "trace"]
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _optional_float(value, default):
+    return float(value) if value is not None and pd.notna(value) else default
+
+
+def load_batch(path: str, args) -> list:
+    """Run specs from a JSON list of objects or a CSV file."""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        rows = pd.read_csv(path).to_dict("records")
+    return [
+        {
+            "protocol": row["protocol"] if pd.notna(row.get("protocol")) else args.protocol[0],
+            "n": int(row["n"]),
+            "eve_on": _parse_bool(row.get("eve_on", False)),
+            "noise_prob": float(row.get("noise_prob", 0.0)),
+            "seed": int(row["seed"]) if pd.notna(row.get("seed")) else secrets.randbits(32),
+            "seeded": pd.notna(row.get("seed")),
+            "eve_strategy": row["eve_strategy"] if pd.notna(row.get("eve_strategy")) else args.eve_strategy,
+            "eve_fraction": _optional_float(row.get("eve_fraction"), args.eve_fraction),
+            "mean_photon_number": _optional_float(row.get("mean_photon_number"), args.mu),
+        }
+        for row in rows
+    ]
+
+
+def build_runs(args) -> list:
+    if args.batch:
+        runs = load_batch(args.batch, args)
+    else:
+        eve_settings = {"off": [False], "on": [True], "both": [False, True]}[args.eve]
+        base_seed = secrets.randbits(32) if args.seed is None else args.seed
+        runs = []
+        grid = itertools.product(args.protocol, args.n, eve_settings, args.noise)
+        for protocol, n, eve_on, noise in grid:
+            for _ in range(args.repeats):
+                runs.append({"protocol": protocol, "n": n, "eve_on": eve_on, "noise_prob": noise,
+                             "seed": base_seed + len(runs), "eve_strategy": args.eve_strategy,
+                             "eve_fraction": args.eve_fraction, "mean_photon_number": args.mu})
+    for i, run in enumerate(runs):
+        run["run"] = i
+    return runs
+
+
+def final_key(block):
+    """Reconciled, privacy-amplified key of one block (None when errors remain or nothing secret is left)."""
+    if not block.num_matches:
+        return None
+    rng = np.random.default_rng()
+    # The QBER comes from a disclosed sample, not from the simulation; the sample leaves the key
+    qber_estimate, keep = estimate_qber(block.sifted_key(), block.sifted_key("bob"), rng=rng)
+    cascade = reconcile(block.sifted_key()[keep], block.sifted_key("bob")[keep], qber_estimate, rng=rng)
+    if cascade.residual_errors:
+        return None
+    amplified = amplify(cascade.key, qber_estimate, cascade.leaked_bits, rng=rng)
+    return amplified.key if amplified.output_bits else None
+
+
+def run_one(run: dict, out_dir: str, trace: bool, block_size: int, key_pool: str = None) -> dict:
+    """Simulate one run block by block, streaming its trace to Parquet if requested."""
+    start = time.perf_counter()
+    stats = RunningStats(run["n"], tail_size=0, protocol=run["protocol"])
+    writer = None
+    # Runs in worker processes share the pool file; KeyPool locks it per deposit
+    pool = KeyPool(key_pool) if key_pool and not run["eve_on"] else None
+    eve = EveStrategy(run["eve_strategy"], run["eve_fraction"], run["mean_photon_number"])
+    trace_path = os.path.join(out_dir, f"trace_{run['run']:04d}.parquet") if trace else None
+    try:
+        for block in simulate_blocks(run["n"], run["eve_on"], run["noise_prob"], block_size,
+                                     rng=RoleStreams.from_seed(run["seed"]), eve=eve,
+                                     protocol=run["protocol"]):
+            stats.update(block)
+            key = final_key(block) if pool is not None else None
+            if key is not None:
+                pool.deposit(key)
+            if trace:
+                import pyarrow.parquet as pq
+
+                table = to_arrow(block)
+                if writer is None:
+                    writer = pq.ParquetWriter(trace_path, table.schema, compression="zstd")
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+        if pool is not None:
+            pool.close()
+    seconds = time.perf_counter() - start
+    return {
+        **run,
+        "sifted": stats.sifted,
+        "errors": stats.errors,
+        "qber": stats.qber,
+        "chsh": stats.chsh,
+        "seconds": seconds,
+        "photons_per_second": run["n"] / seconds if seconds > 0 else None,
+        "trace": os.path.basename(trace_path) if trace_path else None,
+    }
+
+
+def write_summary(rows: list, out_dir: str, args):
+    df = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    df.to_parquet(os.path.join(out_dir, "summary.parquet"), index=False)
+    meta = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "block_size": args.block_size,
+        "runs": json.loads(df.to_json(orient="records")),
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m qkdsim", description="Headless QKD batch runner.")
+    parser.add_argument("--protocol", nargs="+", choices=sorted(PROTOCOLS), default=["bb84"])
+    parser.add_argument("--n", type=int, nargs="+", default=[100_000], help="photons per run")
+    parser.add_argument("--eve", choices=["off", "on", "both"], default="off")
+    parser.add_argument("--eve-strategy", choices=sorted(STRATEGIES), default="intercept_resend")
+    parser.add_argument("--eve-fraction", type=float, default=1.0,
+                        help="share of photons Eve intercepts (single-photon pulses for pns)")
+    parser.add_argument("--mu", type=float, default=None, help="mean photon number of the source (pns)")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.02], help="quantum noise probability")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the first run (random if omitted)")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per parameter combination")
+    parser.add_argument("--batch", help="JSON or CSV file with n, eve_on, noise_prob, seed per run")
+    parser.add_argument("--trace", action="store_true", help="also write the full per-photon trace")
+    parser.add_argument("--out", default="bb84_runs", help="output directory")
+    parser.add_argument("--workers", type=int, default=1, help="runs executed in parallel")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--key-pool", help="deposit the amplified keys of unseeded runs without Eve into this "
+                                           "key pool file")
+    args = parser.parse_args(argv)
+
+    if args.eve_strategy == "pns" and args.mu is None:
+        parser.error("--eve-strategy pns needs --mu")
+    if args.key_pool and args.seed is not None:
+        parser.error("--key-pool cannot be used with --seed: seeded runs repeat their keys")
+    runs = build_runs(args)
+    # Batch rows bypass argparse, so check them like the flags
+    for run in runs:
+        if run["protocol"] not in PROTOCOLS:
+            parser.error(f"run {run['run']}: unknown protocol {run['protocol']!r}")
+        if run["eve_strategy"] not in STRATEGIES:
+            parser.error(f"run {run['run']}: unknown eve_strategy {run['eve_strategy']!r}")
+        if run["eve_strategy"] == "pns" and run["mean_photon_number"] is None:
+            parser.error(f"run {run['run']}: eve_strategy pns needs mean_photon_number (or --mu)")
+    if args.key_pool and any(run.get("seeded") for run in runs):
+        parser.error("--key-pool cannot be used with seeds from --batch: seeded runs repeat their keys")
+    os.makedirs(args.out, exist_ok=True)
+    jobs = (runs, [args.out] * len(runs), [args.trace] * len(runs), [args.block_size] * len(runs),
+            [args.key_pool] * len(runs))
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 and len(runs) > 1 else None
+    results = []
+    try:
+        for row in (pool.map if pool else map)(run_one, *jobs):
+            results.append(row)
+            print(f"run {row['run']}: {row['protocol']} n={row['n']} eve={row['eve_on']} noise={row['noise_prob']} "
+                  f"QBER={row['qber']:.4f} ({row['seconds']:.2f} s)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    df = write_summary(results, args.out, args)
+    print(f"Wrote {len(df)} runs to {args.out}")
+    return df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""Vectorized QKD simulation core.
+
+Every photon of a run is generated at once as NumPy arrays instead of in a
+Python loop, so the Streamlit pages only have to call :func:`simulate` and
+render the result. The protocol (:mod:`qkdsim.protocols`) supplies the
+encoding, the measurement axes and the sifting rule; Eve (:mod:`qkdsim.eve`),
+Bob's measurement and the channel noise are the same for every protocol.
+
+Every column is an int8/uint8/bool array (see :mod:`qkdsim.schema` for the
+typed DataFrame and Parquet form); labels are only produced for display.
+Encoding used throughout the arrays:
+
+* basis: index into the protocol's bases, for BB84 ``0`` = rectilinear
+  (``"rect"``), ``1`` = diagonal (``"diag"``)
+* photon states: codes of :mod:`qkdsim.optics` (0°, 22.5°, ... 157.5°, R, L)
+* LED: ``0`` = Transmitted, ``1`` = Reflected, ``2`` = Both
+"""
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from qkdsim.eve import EveStrategy
+from qkdsim.optics import BIASED, OUTCOME_LUT, P0, RANDOM, STATE_LABELS, random_bits
+from qkdsim.protocols import ProtocolLike, chsh_value, correlation_counts, get_protocol
+
+LED_LABELS = ["Transmitted", "Reflected", "Both"]
+
+# Truth table from the landing page: (Alice polarization, Bob basis) -> (LED, bit)
+TRUTH_TABLE = {
+    (-45, 0): ("Both", "Random"),
+    (-45, 45): ("Transmitted", 0),
+    (0, 0): ("Transmitted", 0),
+    (0, 45): ("Both", "Random"),
+    (45, 0): ("Both", "Random"),
+    (45, 45): ("Reflected", 1),
+    (90, 0): ("Reflected", 1),
+    (90, 45): ("Both", "Random"),
+}
+
+
+def table_outcome(alice_angle_deg, bob_basis):
+    """
+    Return (led, outcome_bit or 'Random') according to the truth table.
+    bob_basis: 'rect' or 'diag'
+    """
+    bob_lookup = 0 if bob_basis == "rect" else 45
+    a = alice_angle_deg % 180
+    if a == 135:
+        a = -45
+    return TRUTH_TABLE.get((a, bob_lookup), ("Both", "Random"))
+
+
+@dataclass
+class RoleStreams:
+    """Independent random streams for each party of a run."""
+    alice: np.random.Generator
+    eve: np.random.Generator
+    bob: np.random.Generator
+    noise: np.random.Generator
+    # Public discussion: Cascade permutations and the privacy amplification seed
+    public: np.random.Generator
+
+    @classmethod
+    def from_seed(cls, seed=None) -> "RoleStreams":
+        """Spawn one child stream per role from a single SeedSequence."""
+        seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        return cls(*(np.random.default_rng(child) for child in seq.spawn(5)))
+
+    @classmethod
+    def shared(cls, rng: np.random.Generator) -> "RoleStreams":
+        """All roles drawing from the same generator."""
+        return cls(rng, rng, rng, rng, rng)
+
+
+RNGLike = Union[None, int, np.random.SeedSequence, np.random.Generator, RoleStreams]
+
+
+def role_streams(rng: RNGLike = None) -> RoleStreams:
+    """Normalize a seed, Generator or RoleStreams into RoleStreams."""
+    if isinstance(rng, RoleStreams):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        return RoleStreams.shared(rng)
+    return RoleStreams.from_seed(rng)
+
+
+def _labels(codes: np.ndarray, categories: list) -> pd.Categorical:
+    return pd.Categorical.from_codes(codes.astype(np.int8), categories)
+
+
+@dataclass
+class SimulationResult:
+    """Column arrays of one run; ``eve_*`` fields are None without Eve."""
+    alice_basis: np.ndarray
+    alice_bit: np.ndarray
+    alice_state: np.ndarray
+    photon_state: np.ndarray
+    bob_basis: np.ndarray
+    led: np.ndarray
+    random_outcome: np.ndarray
+    noise_flip: np.ndarray
+    bob_bit_pre_noise: np.ndarray
+    bob_bit: np.ndarray
+    # Sifting mask: equal bases, or conclusive outcomes for B92
+    bases_match: np.ndarray
+    eve_axis: Optional[np.ndarray] = None
+    eve_bit: Optional[np.ndarray] = None
+    eve_intercepted: Optional[np.ndarray] = None
+    protocol: str = "bb84"
+
+    @property
+    def n(self) -> int:
+        return len(self.alice_bit)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays (shared arrays counted once)."""
+        arrays = {id(a): a for a in vars(self).values() if isinstance(a, np.ndarray)}
+        return sum(a.nbytes for a in arrays.values())
+
+    @property
+    def num_matches(self) -> int:
+        return int(np.count_nonzero(self.bases_match))
+
+    @property
+    def errors(self) -> int:
+        return int(np.count_nonzero(self.bases_match & (self.alice_bit != self.bob_bit)))
+
+    @property
+    def qber(self) -> float:
+        matches = self.num_matches
+        return self.errors / matches if matches else 0.0
+
+    @property
+    def eve_knowledge(self) -> float:
+        """Share of the sifted key Eve holds correctly (0 without Eve)."""
+        matches = self.num_matches
+        if self.eve_bit is None or not matches:
+            return 0.0
+        known = self.bases_match & self.eve_intercepted & (self.eve_bit == self.alice_bit)
+        return int(np.count_nonzero(known)) / matches
+
+    @property
+    def fair_outcomes(self) -> int:
+        """Number of 50/50 outcomes, the ones that take Bob's bit from ``quantum_bits``."""
+        axes = get_protocol(self.protocol).bob_axes[self.bob_basis]
+        return int(np.count_nonzero(OUTCOME_LUT[self.photon_state, axes] == RANDOM))
+
+    @property
+    def chsh(self) -> Optional[float]:
+        """CHSH value from the non-key settings (E91 only, None otherwise)."""
+        protocol = get_protocol(self.protocol)
+        if protocol.chsh_settings is None:
+            return None
+        counts = correlation_counts(protocol, self.alice_basis, self.bob_basis, self.alice_bit, self.bob_bit)
+        return chsh_value(protocol, counts)
+
+    def sifted_key(self, party: str = "alice") -> np.ndarray:
+        """Bits kept after sifting, from Alice's or Bob's side."""
+        bits = self.alice_bit if party == "alice" else self.bob_bit
+        return bits[self.bases_match]
+
+    def to_dataframe(self, start: int = 0, stop: Optional[int] = None,
+                     rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Human readable table with the page's column names.
+
+        Covers rows ``start:stop``, or the photon indices in ``rows`` if given.
+        """
+        if rows is None:
+            start, stop, _ = slice(start, stop).indices(self.n)
+            sl = slice(start, stop)
+            index = pd.RangeIndex(start, max(start, stop))
+        else:
+            sl = np.asarray(rows, dtype=np.intp)
+            index = pd.Index(sl)
+        led = self.led[sl]
+        rnd = self.random_outcome[sl]
+        flip = self.noise_flip[sl]
+        notes = [
+            f"{name} – {kind} outcome{suffix}"
+            for name in LED_LABELS
+            for kind in ("deterministic", "random")
+            for suffix in ("", " + quantum noise")
+        ]
+        note_code = led.astype(np.int8) * 4 + rnd * 2 + flip
+        protocol = get_protocol(self.protocol)
+        bob_basis = self.bob_basis[sl]
+        return pd.DataFrame({
+            "Alice basis": _labels(self.alice_basis[sl], protocol.alice_basis_labels),
+            "Bob basis": _labels(bob_basis, protocol.bob_basis_labels),
+            "Alice polarization": _labels(self.alice_state[sl], STATE_LABELS),
+            "Photon to Bob": _labels(self.photon_state[sl], STATE_LABELS),
+            "Bob analyzer": _labels(protocol.bob_axes[bob_basis], STATE_LABELS),
+            "Alice bit": self.alice_bit[sl],
+            "Bob bit (pre-noise)": self.bob_bit_pre_noise[sl],
+            "Bob bit": self.bob_bit[sl],
+            "LED": _labels(led, LED_LABELS),
+            "Outcome": _labels(rnd, ["Deterministic", "Random"]),
+            "Bases match": _labels(self.bases_match[sl], ["No", "Yes"]),
+            "Bob note": _labels(note_code, notes),
+        }, index=index)
+
+
+def measure_bob(photon_state: np.ndarray, bob_axis: np.ndarray, streams: RoleStreams,
+                quantum_bits: Optional[np.ndarray] = None):
+    """
+    Bob's LED codes, random-outcome mask and bits for the incoming photons.
+
+    Certain outcomes come straight from :data:`qkdsim.optics.OUTCOME_LUT`.
+    Fair-coin outcomes consume ``quantum_bits`` in order, exactly like the
+    original per-photon loop, and missing bits are drawn from Bob's stream;
+    biased outcomes (e.g. Breidbart states or E91 settings) are drawn from
+    Bob's stream with the Malus probability.
+    """
+    outcome = OUTCOME_LUT[photon_state, bob_axis]
+    random_outcome = outcome < 0
+    led = np.where(random_outcome, np.int8(2), outcome)
+    bits = np.where(random_outcome, np.int8(0), outcome).view(np.uint8)
+
+    fair = outcome == RANDOM
+    k = int(np.count_nonzero(fair))
+    if quantum_bits is not None:
+        fill = np.asarray(quantum_bits[:k], dtype=np.uint8)
+        if len(fill) < k:
+            fill = np.concatenate([fill, random_bits(streams.bob, k - len(fill))])
+    else:
+        fill = random_bits(streams.bob, k)
+    bits[fair] = fill
+
+    biased = np.flatnonzero(outcome == BIASED)
+    if len(biased):
+        p0 = P0[photon_state[biased], bob_axis[biased]]
+        bits[biased] = streams.bob.random(len(biased), dtype=np.float32) >= p0
+    return led, random_outcome, bits
+
+
+def simulate(n: int, eve_on: bool = False, noise_prob: float = 0.0,
+             rng: RNGLike = None,
+             quantum_bits: Optional[np.ndarray] = None,
+             eve: Optional[EveStrategy] = None,
+             protocol: ProtocolLike = "bb84") -> SimulationResult:
+    """
+    Simulate ``n`` photons (pairs for E91) of ``protocol``.
+
+    ``rng`` is an integer seed, a SeedSequence, a Generator shared by all roles
+    or a :class:`RoleStreams`; the same seed always reproduces the same run.
+    ``quantum_bits`` (e.g. from the QRNG) are consumed in order for Bob's random
+    outcomes, exactly like the original per-photon loop; missing bits are drawn
+    from Bob's stream. With ``eve_on`` the photons pass through ``eve``
+    (full intercept-resend by default, see :mod:`qkdsim.eve`).
+    """
+    streams = role_streams(rng)
+    protocol = get_protocol(protocol)
+
+    # --- Alice ---
+    alice_basis, alice_bit, alice_state = protocol.prepare(n, streams.alice)
+
+    # --- Eve ---
+    action = None
+    photon_state = alice_state
+    if eve_on:
+        action = (eve or EveStrategy()).apply(alice_basis, alice_bit, alice_state, protocol.bob_axes,
+                                              streams.eve)
+        photon_state = action.photon_state
+
+    # --- Bob ---
+    bob_basis = protocol.bob_bases(n, streams.bob)
+    led, random_outcome, bob_bit_pre_noise = measure_bob(photon_state, protocol.bob_axes[bob_basis],
+                                                         streams, quantum_bits)
+
+    # Apply quantum noise (flip with given probability)
+    if noise_prob > 0:
+        noise_flip = streams.noise.random(n, dtype=np.float32) < noise_prob
+    else:
+        noise_flip = np.zeros(n, dtype=bool)
+    bob_bit = bob_bit_pre_noise ^ noise_flip
+
+    return SimulationResult(
+        alice_basis=alice_basis,
+        alice_bit=alice_bit,
+        alice_state=alice_state,
+        photon_state=photon_state,
+        bob_basis=bob_basis,
+        led=led,
+        random_outcome=random_outcome,
+        noise_flip=noise_flip,
+        bob_bit_pre_noise=bob_bit_pre_noise,
+        bob_bit=bob_bit,
+        # Sifting happens in public between Alice and Bob
+        bases_match=protocol.sift(alice_basis, bob_basis, bob_bit),
+        eve_axis=action.eve_axis if action else None,
+        eve_bit=action.eve_bit if action else None,
+        eve_intercepted=action.intercepted if action else None,
+        protocol=protocol.name,
+    )
@@ -0,0 +1,125 @@
+"""Compact bit-packed key type shared by the simulation and encryption pages.
+
+A :class:`PackedKey` stores 8 key bits per byte (MSB first, like
+``numpy.packbits``), so multi-megabit keys take kilobytes of session memory
+instead of a Python list of ints.
+"""
+import base64
+from typing import Optional, Union
+
+import numpy as np
+
+_ZERO, _ONE = ord("0"), ord("1")
+
+
+class PackedKey:
+    """Immutable sequence of bits backed by a packed uint8 array."""
+
+    __slots__ = ("_data", "_nbits")
+
+    def __init__(self, data: Union[bytes, bytearray, np.ndarray] = b"", nbits: Optional[int] = None):
+        arr = np.array(np.frombuffer(bytes(data), dtype=np.uint8) if not isinstance(data, np.ndarray)
+                       else data, dtype=np.uint8).ravel()
+        if nbits is None:
+            nbits = len(arr) * 8
+        if nbits > len(arr) * 8:
+            raise ValueError(f"{nbits} bits do not fit in {len(arr)} bytes")
+        arr = arr[:(nbits + 7) // 8]
+        # Keep the padding bits of the last byte at zero so equality and hashing are exact
+        if nbits % 8:
+            arr[-1] &= (0xFF << (8 - nbits % 8)) & 0xFF
+        arr.flags.writeable = False
+        self._data = arr
+        self._nbits = nbits
+
+    # --- Constructors ---
+    @classmethod
+    def from_bits(cls, bits) -> "PackedKey":
+        bits = np.asarray(bits, dtype=np.uint8)
+        return cls(np.packbits(bits), len(bits))
+
+    @classmethod
+    def from_bitstring(cls, text: str) -> "PackedKey":
+        """Parse a string of '0'/'1' characters; any other character is ignored."""
+        raw = np.frombuffer(text.encode("ascii", "ignore"), dtype=np.uint8)
+        return cls.from_bits(raw[(raw == _ZERO) | (raw == _ONE)] - _ZERO)
+
+    @classmethod
+    def from_hex(cls, text: str, nbits: Optional[int] = None) -> "PackedKey":
+        return cls(bytes.fromhex(text), nbits)
+
+    @classmethod
+    def from_base64(cls, text: str, nbits: Optional[int] = None) -> "PackedKey":
+        return cls(base64.b64decode(text), nbits)
+
+    # --- Views ---
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def to_bits(self) -> np.ndarray:
+        """Unpacked bits as a uint8 array of 0/1."""
+        return np.unpackbits(self._data, count=self._nbits)
+
+    def to_bitstring(self, limit: Optional[int] = None) -> str:
+        """The key as '0'/'1' text, optionally only its first ``limit`` bits."""
+        key = self if limit is None or limit >= self._nbits else self[:limit]
+        return (key.to_bits() + _ZERO).tobytes().decode("ascii")
+
+    def to_bytes(self) -> bytes:
+        return self._data.tobytes()
+
+    def to_numpy(self) -> np.ndarray:
+        """The packed bytes as a read-only uint8 array."""
+        return self._data
+
+    def hex(self) -> str:
+        return self._data.tobytes().hex()
+
+    def base64(self) -> str:
+        return base64.b64encode(self._data.tobytes()).decode("ascii")
+
+    # --- Sequence protocol ---
+    def __len__(self) -> int:
+        return self._nbits
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._nbits)
+            if step != 1:
+                return PackedKey.from_bits(self.to_bits()[index])
+            stop = max(start, stop)
+            chunk = self._data[start // 8:(stop + 7) // 8]
+            if start % 8 == 0:
+                return PackedKey(chunk, stop - start)
+            offset = start % 8
+            return PackedKey.from_bits(np.unpackbits(chunk)[offset:offset + stop - start])
+        i = index + self._nbits if index < 0 else index
+        if not 0 <= i < self._nbits:
+            raise IndexError("key index out of range")
+        return int(self._data[i >> 3] >> (7 - (i & 7))) & 1
+
+    def __iter__(self):
+        return iter(self.to_bits().tolist())
+
+    def __xor__(self, other: "PackedKey") -> "PackedKey":
+        if len(other) != self._nbits:
+            raise ValueError(f"cannot XOR keys of {self._nbits} and {len(other)} bits")
+        return PackedKey(np.bitwise_xor(self._data, other._data), self._nbits)
+
+    def __add__(self, other: "PackedKey") -> "PackedKey":
+        if self._nbits % 8 == 0:
+            return PackedKey(np.concatenate([self._data, other._data]), self._nbits + len(other))
+        return PackedKey.from_bits(np.concatenate([self.to_bits(), other.to_bits()]))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PackedKey):
+            return NotImplemented
+        return self._nbits == other._nbits and np.array_equal(self._data, other._data)
+
+    def __hash__(self):
+        return hash((self._nbits, self._data.tobytes()))
+
+    def __repr__(self) -> str:
+        preview = self.to_bitstring(32)
+        return f"PackedKey({self._nbits} bits: {preview}{'…' if self._nbits > 32 else ''})"
@@ -0,0 +1,216 @@
+"""Persistent one-time-pad key pool backed by a memory-mapped file.
+
+QKD runs :meth:`KeyPool.deposit` their final keys into the pool and
+encryptions :meth:`KeyPool.reserve` the bytes they need from it. Every byte is
+handed out once: the pool keeps two monotonic byte offsets in the file header,
+``consumed`` and ``deposited``, and a reservation only moves ``consumed``
+forward, so allocation is O(1) and a key byte can never be reused. Requests
+larger than the unused key raise :class:`InsufficientKeyError` instead of
+stretching the key.
+
+File layout: a 64-byte header (magic, ``consumed``, ``deposited``) followed by
+the key bytes; the file grows by doubling and deposits are copied straight
+into the mapping. Offsets are positions in the key stream since the pool was
+created, which is what the receiving side needs to decrypt
+(:meth:`KeyPool.key_at`). All updates hold a thread lock and, where
+``fcntl`` exists, an exclusive ``flock`` on the file, so Streamlit sessions
+and batch runs in other processes can share one pool.
+
+Encryptions bind their reservation to the ciphertext with :meth:`KeyPool.bind`
+(its length and SHA-256 digest, appended to a side file next to the pool), and
+:meth:`KeyPool.key_for` hands the key bytes out for decryption only to that
+ciphertext. Otherwise XORing any upload with reserved bytes would reveal them.
+"""
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Union
+
+import numpy as np
+
+from qkdsim.key import PackedKey
+
+try:
+    import fcntl
+except ImportError:  # Windows: sessions of one server process are still serialized by the thread lock
+    fcntl = None
+
+DEFAULT_KEY_POOL_PATH = ".qkd_key_pool.bin"
+# Side file with one "offset nbytes sha256" line per encrypted ciphertext
+BINDINGS_SUFFIX = ".ciphertexts"
+MAGIC = b"QKDPOOL1"
+HEADER = struct.Struct("<8sQQ")
+HEADER_SIZE = 64
+MIN_CAPACITY = 1 << 20
+
+
+class InsufficientKeyError(ValueError):
+    """Raised instead of reusing key material when the pool holds too few unused bytes."""
+
+
+class CiphertextMismatchError(ValueError):
+    """Raised when key bytes are requested for a ciphertext they were not reserved for."""
+
+
+class KeyPool:
+    """
+    Memory-mapped, append-only pool of key bytes with atomic consumption.
+
+    Deposits are truncated to whole bytes (at most 7 bits per deposit are
+    dropped). Call :meth:`stats` for the counters shown on the pages.
+    """
+
+    def __init__(self, path: str = DEFAULT_KEY_POOL_PATH):
+        self.path = path
+        self.bindings_path = path + BINDINGS_SUFFIX
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._mm = None
+        with self._locked():
+            if os.fstat(self._fd).st_size < HEADER_SIZE:
+                os.ftruncate(self._fd, HEADER_SIZE + MIN_CAPACITY)
+                self._remap()
+                self._write_header(0, 0)
+            magic, _, _ = HEADER.unpack_from(self._mm)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a key pool file")
+
+    # --- File plumbing ---
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # Another process may have grown the file since our last look
+                size = os.fstat(self._fd).st_size
+                if size and (self._mm is None or len(self._mm) != size):
+                    self._remap()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _remap(self):
+        # The old mapping is not closed: arrays returned by key_at may still point into it
+        self._mm = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+
+    def _read_header(self):
+        _, consumed, deposited = HEADER.unpack_from(self._mm)
+        return consumed, deposited
+
+    def _write_header(self, consumed: int, deposited: int):
+        HEADER.pack_into(self._mm, 0, MAGIC, consumed, deposited)
+
+    def close(self):
+        self._mm = None
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Key material ---
+    @property
+    def available(self) -> int:
+        """Unused key bytes."""
+        with self._locked():
+            consumed, deposited = self._read_header()
+        return deposited - consumed
+
+    def deposit(self, key: Union[PackedKey, bytes, np.ndarray]) -> int:
+        """Append the whole bytes of ``key`` to the pool; returns the number of bytes added."""
+        if isinstance(key, PackedKey):
+            data = key.to_numpy()[:len(key) // 8]
+        else:
+            data = np.frombuffer(key, dtype=np.uint8) if not isinstance(key, np.ndarray) else key
+        if not len(data):
+            return 0
+        with self._locked():
+            consumed, deposited = self._read_header()
+            end = HEADER_SIZE + deposited + len(data)
+            if end > len(self._mm):
+                os.ftruncate(self._fd, max(end, HEADER_SIZE + 2 * (len(self._mm) - HEADER_SIZE)))
+                self._remap()
+            self._mm[HEADER_SIZE + deposited:end] = data.tobytes()
+            # Data before header: a crash never exposes bytes that were not written
+            self._write_header(consumed, deposited + len(data))
+        return len(data)
+
+    def reserve(self, nbytes: int) -> int:
+        """Claim the next ``nbytes`` unused key bytes and return their offset."""
+        with self._locked():
+            consumed, deposited = self._read_header()
+            if nbytes > deposited - consumed:
+                raise InsufficientKeyError(
+                    f"Need {nbytes} key bytes but only {deposited - consumed} unused bytes are in the pool")
+            self._write_header(consumed + nbytes, deposited)
+        return consumed
+
+    def key_at(self, offset: int, nbytes: int) -> np.ndarray:
+        """
+        Read-only view of ``nbytes`` already reserved key bytes at ``offset``.
+
+        Used to encrypt with a reservation and by the receiver to decrypt;
+        unreserved bytes are refused so they cannot be used without
+        consuming them.
+        """
+        with self._locked():
+            consumed, _ = self._read_header()
+            if offset < 0 or offset + nbytes > consumed:
+                raise InsufficientKeyError(f"Key bytes {offset}..{offset + nbytes} have not been reserved")
+            view = np.frombuffer(self._mm, dtype=np.uint8, count=nbytes, offset=HEADER_SIZE + offset)
+        view.flags.writeable = False
+        return view
+
+    def bind(self, offset: int, nbytes: int, digest: str):
+        """Record that the reservation at ``offset`` encrypted ``nbytes`` bytes with SHA-256 ``digest``."""
+        with self._locked():
+            consumed, _ = self._read_header()
+            if offset < 0 or offset + nbytes > consumed:
+                raise InsufficientKeyError(f"Key bytes {offset}..{offset + nbytes} have not been reserved")
+            with open(self.bindings_path, "a") as f:
+                f.write(f"{offset} {nbytes} {digest}\n")
+
+    def _binding(self, offset: int):
+        if not os.path.exists(self.bindings_path):
+            return None
+        found = None
+        with open(self.bindings_path) as f:
+            for line in f:
+                start, nbytes, digest = line.split()
+                if int(start) == offset:
+                    found = int(nbytes), digest
+        return found
+
+    def key_for(self, offset: int, nbytes: int, digest: str) -> np.ndarray:
+        """
+        Key bytes at ``offset`` to decrypt the ``nbytes`` ciphertext with SHA-256 ``digest``.
+
+        Raises :class:`CiphertextMismatchError` unless that ciphertext was bound
+        to the reservation with :meth:`bind`.
+        """
+        with self._locked():
+            binding = self._binding(offset)
+        if binding is None:
+            raise CiphertextMismatchError(f"No ciphertext was encrypted with the key bytes at offset {offset}")
+        if binding != (nbytes, digest):
+            raise CiphertextMismatchError(
+                f"This is not the {binding[0]}-byte ciphertext encrypted with the key bytes at offset {offset}")
+        return self.key_at(offset, nbytes)
+
+    def take(self, nbytes: int):
+        """Reserve ``nbytes`` and return ``(offset, key bytes)``."""
+        offset = self.reserve(nbytes)
+        return offset, self.key_at(offset, nbytes)
+
+    def stats(self) -> dict:
+        with self._locked():
+            consumed, deposited = self._read_header()
+            file_bytes = len(self._mm)
+        return {"available_bytes": deposited - consumed, "consumed_bytes": consumed,
+                "deposited_bytes": deposited, "file_bytes": file_bytes}
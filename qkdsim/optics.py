@@ -0,0 +1,68 @@
+"""Polarization states and measurements shared by every protocol and party.
+
+A photon's polarization is a ``uint8`` code into a small table of states:
+linear polarizations every 22.5° (codes 0–7) plus right and left circular.
+That covers the BB84 and six-state encodings, the Breidbart basis and the E91
+analyzer settings. A measurement is described by its *axis*, the state read as
+bit 0 ("Transmitted"); the orthogonal state is read as bit 1. The outcome
+probabilities of every (state, axis) pair come from the Stokes vectors once,
+so measuring a whole run is a table lookup:
+
+* :data:`P0` – probability of bit 0 (Malus's law for linear polarizations)
+* :data:`OUTCOME_LUT` – 0 / 1 when certain, :data:`RANDOM` for a fair coin,
+  :data:`BIASED` for anything in between (drawn with :data:`P0`)
+"""
+import numpy as np
+
+RECT, DIAG = 0, 1
+BASIS_LABELS = ["rect", "diag"]
+
+# Linear polarizations at k · 22.5°
+H, D, V, A = 0, 2, 4, 6  # 0°, 45°, 90°, 135° (= -45°)
+R, L = 8, 9  # right / left circular
+LINEAR_STEP = 22.5
+STATE_LABELS = [f"{k * LINEAR_STEP:g}°" for k in range(8)] + ["R", "L"]
+ORTHOGONAL = np.array([4, 5, 6, 7, 0, 1, 2, 3, L, R], dtype=np.uint8)
+# Axis of the Breidbart basis, halfway between rect and diag: bit 0 states
+# (0°, 135°) lie ±22.5° around 157.5°, bit 1 states (90°, 45°) around 67.5°
+BREIDBART_AXIS = 7
+
+_theta = np.deg2rad(2 * LINEAR_STEP * np.arange(8))
+STOKES = np.vstack([
+    np.column_stack([np.cos(_theta), np.sin(_theta), np.zeros(8)]),
+    [[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]],
+])
+# P0[state, axis]: probability that ``state`` is read as bit 0 along ``axis``
+P0 = np.round((1 + STOKES @ STOKES.T) / 2, 12).astype(np.float32)
+
+RANDOM, BIASED = -1, -2
+OUTCOME_LUT = np.select([P0 == 1, P0 == 0, P0 == 0.5], [0, 1, RANDOM], BIASED).astype(np.int8)
+
+
+def state_code(angle_deg) -> int:
+    """Code of the linear polarization at ``angle_deg`` (a multiple of 22.5°)."""
+    return int(round((angle_deg % 180) / LINEAR_STEP)) % 8
+
+
+def random_bits(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Return ``n`` uniform bits as a uint8 array (one RNG byte per 8 bits)."""
+    raw = np.frombuffer(rng.bytes((n + 7) // 8), dtype=np.uint8)
+    return np.unpackbits(raw, count=n)
+
+
+def random_choice(rng: np.random.Generator, n: int, k: int) -> np.ndarray:
+    """``n`` uniform indices in ``range(k)`` as uint8."""
+    if k == 2:
+        return random_bits(rng, n)
+    return rng.integers(0, k, n, dtype=np.uint8)
+
+
+def encode(axis: np.ndarray, bit: np.ndarray) -> np.ndarray:
+    """State read as ``bit`` along ``axis``: the axis itself for 0, its orthogonal for 1."""
+    return np.where(bit.astype(bool), ORTHOGONAL[axis], axis)
+
+
+def measure(state: np.ndarray, axis: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Measure photons in ``state`` along ``axis`` and return the bits as uint8."""
+    p0 = P0[state, axis]
+    return (rng.random(len(p0), dtype=np.float32) >= p0).view(np.uint8)
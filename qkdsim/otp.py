@@ -0,0 +1,133 @@
+"""One-time-pad (XOR) encryption of text messages with the shared key.
+
+:func:`encrypt_text` and :func:`decrypt_text` work on bytes: the message is
+UTF-8 encoded into a uint8 array and XORed with the key bytes in one NumPy
+operation, so megabyte messages take milliseconds. The key is either a
+:class:`~qkdsim.key.PackedKey` or key bytes reserved from the
+:class:`~qkdsim.keypool.KeyPool`; it is never repeated, a key shorter than
+the data raises :class:`~qkdsim.keypool.InsufficientKeyError`.
+
+:func:`xor_stream` applies the same pad to a file of any size chunk by chunk:
+one reusable buffer is read, XORed in place against the key bytes at the
+running offset and written out, so memory stays at one chunk whatever the
+file size.
+
+:func:`bit_table` explains a window of the result bit by bit. It unpacks only
+the bytes of the window from the plaintext and ciphertext (the key bit is
+their XOR), so its cost depends on the window, not on the message length.
+"""
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Union
+
+import numpy as np
+import pandas as pd
+
+from qkdsim.key import PackedKey
+from qkdsim.keypool import InsufficientKeyError
+
+BytesLike = Union[bytes, bytearray, memoryview, np.ndarray]
+KeyLike = Union[PackedKey, np.ndarray]
+
+EXPLANATIONS = ["Same bits → result 0", "Different bits → result 1"]
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def _as_uint8(data: BytesLike) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+
+
+def key_bytes(key: KeyLike) -> np.ndarray:
+    """The whole key bytes of ``key`` as uint8 (trailing bits of a PackedKey are not usable)."""
+    if isinstance(key, PackedKey):
+        return key.to_numpy()[:len(key) // 8]
+    return key
+
+
+def key_stream(key: KeyLike, nbytes: int, offset: int = 0) -> np.ndarray:
+    """``nbytes`` key bytes starting at byte ``offset`` (a view, never repeated)."""
+    data = key_bytes(key)
+    if offset + nbytes > len(data):
+        raise InsufficientKeyError(f"Need {offset + nbytes} key bytes but the key has {len(data)}")
+    return data[offset:offset + nbytes]
+
+
+def xor_with_key(data: BytesLike, key: KeyLike) -> np.ndarray:
+    """XOR ``data`` with the start of the key; the same call encrypts and decrypts."""
+    data = _as_uint8(data)
+    return np.bitwise_xor(data, key_stream(key, len(data)))
+
+
+def encrypt_text(message: str, key: KeyLike) -> bytes:
+    return xor_with_key(message.encode("utf-8"), key).tobytes()
+
+
+def decrypt_text(ciphertext: BytesLike, key: KeyLike) -> str:
+    """Inverse of :func:`encrypt_text`; undecodable bytes (wrong key) become U+FFFD."""
+    return xor_with_key(ciphertext, key).tobytes().decode("utf-8", errors="replace")
+
+
+@dataclass
+class StreamStats:
+    nbytes: int
+    chunks: int
+    seconds: float
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.nbytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+def xor_stream(src: BinaryIO, dst: BinaryIO, key: KeyLike,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> StreamStats:
+    """
+    XOR everything read from ``src`` with the key and write it to ``dst``.
+
+    Encrypts and decrypts alike. Only one ``chunk_size`` buffer is held at a
+    time; the key is sliced, not copied, so a reservation from the key pool
+    stays in the memory map. ``src`` needs ``readinto`` (files opened in
+    ``"rb"`` mode, ``BytesIO``, Streamlit uploads). Raises
+    :class:`~qkdsim.keypool.InsufficientKeyError` when the key runs out; the
+    output then holds only the chunks before it.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    nbytes = chunks = 0
+    start = time.perf_counter()
+    while True:
+        n = src.readinto(view)
+        if not n:
+            break
+        np.bitwise_xor(data[:n], key_stream(key, n, nbytes), out=data[:n])
+        dst.write(view[:n])
+        nbytes += n
+        chunks += 1
+    return StreamStats(nbytes, chunks, time.perf_counter() - start)
+
+
+def stream_digest(src: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """SHA-256 hex digest of everything read from ``src``, one chunk at a time."""
+    h = hashlib.sha256()
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def bit_table(plaintext: BytesLike, ciphertext: BytesLike, start: int, stop: int) -> pd.DataFrame:
+    """Message, key and XOR bit with an explanation for bits ``start``..``stop`` of the message."""
+    first, last = start // 8, (stop + 7) // 8
+    message = np.unpackbits(_as_uint8(plaintext)[first:last])[start - first * 8:stop - first * 8]
+    xor = np.unpackbits(_as_uint8(ciphertext)[first:last])[start - first * 8:stop - first * 8]
+    return pd.DataFrame({
+        "Position": np.arange(start, start + len(message)),
+        "Message bit": message,
+        "Key bit": message ^ xor,
+        "XOR result": xor,
+        "Explanation": pd.Categorical.from_codes(xor, EXPLANATIONS),
+    })
@@ -0,0 +1,251 @@
+"""Per-stage timing and peak-memory instrumentation.
+
+A :class:`Profiler` times named stages of one run with ``perf_counter`` and,
+while a stage is open, samples the resident set size of the process on a
+background thread, so NumPy and pandas allocations are seen without tracing
+every allocation. Finished runs are kept as :class:`RunReport` for display
+and appended as one JSON line each to a local log for later profiling::
+
+    profiler = Profiler()
+    with profiler.run("simulation", n=n):
+        with profiler.stage("qrng"):
+            ...
+        with profiler.stage("simulate"):
+            ...
+    print(profiler.last.to_frame())
+
+Profiling is off unless ``QKDSIM_PROFILE`` is set (or ``enabled=True`` is
+passed). Disabled, :meth:`Profiler.run` and :meth:`Profiler.stage` return a
+shared no-op context manager and nothing is sampled or written.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import pandas as pd
+
+ENV_ENABLE = "QKDSIM_PROFILE"
+ENV_LOG = "QKDSIM_PROFILE_LOG"
+DEFAULT_LOG_PATH = "qkdsim_profile.jsonl"
+# Seconds between RSS samples while a stage is open
+DEFAULT_INTERVAL = 0.005
+
+_NULL = nullcontext()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, or None where it cannot be read."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS (kilobytes on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(ENV_ENABLE, "").lower() not in ("", "0", "false", "no")
+
+
+@dataclass
+class StageRecord:
+    """
+    One finished stage.
+
+    ``stage`` is the path of nested stage names (``"read/decode"``) and
+    ``peak_bytes`` the RSS growth above the value at the stage's start.
+    """
+    stage: str
+    start: float  # seconds since the run began
+    seconds: float
+    peak_bytes: Optional[int]
+    depth: int = 0
+
+
+@dataclass
+class RunReport:
+    name: str
+    started: str
+    seconds: float = 0.0
+    peak_rss: Optional[int] = None
+    meta: dict = field(default_factory=dict)
+    stages: List[StageRecord] = field(default_factory=list)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Stages with seconds, share of the run time and peak memory growth in MB."""
+        df = pd.DataFrame([asdict(s) for s in self.stages],
+                          columns=["stage", "start", "seconds", "peak_bytes", "depth"])
+        df["share"] = df["seconds"] / self.seconds if self.seconds else 0.0
+        df["peak_mb"] = df["peak_bytes"] / 1e6
+        return df[["stage", "seconds", "share", "peak_mb"]]
+
+    def summary(self) -> pd.DataFrame:
+        """Stages merged by name (e.g. repeated per file): calls, total seconds, share, peak MB."""
+        df = self.to_frame()
+        df["calls"] = 1
+        grouped = df.groupby("stage", sort=False).agg(
+            calls=("calls", "sum"), seconds=("seconds", "sum"), share=("share", "sum"), peak_mb=("peak_mb", "max"))
+        return grouped.reset_index()
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+
+class _Sampler(threading.Thread):
+    """Polls RSS and raises the running peak of every open stage."""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.open_peaks = []  # [start_rss, peak_rss] per open stage, innermost last
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        rss = rss_bytes()
+        if rss is None:
+            return
+        for peak in list(self.open_peaks):
+            if rss > peak[1]:
+                peak[1] = rss
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """
+    Context-manager timers with peak-memory sampling, grouped into runs.
+
+    ``enabled`` defaults to the ``QKDSIM_PROFILE`` environment variable and
+    ``log_path`` to ``QKDSIM_PROFILE_LOG`` (then :data:`DEFAULT_LOG_PATH`);
+    ``log_path=""`` keeps reports in memory only. Stages may be nested. Where
+    a ``with`` block is awkward (a long Streamlit script), :meth:`start` and
+    :meth:`flush` open and close a run explicitly; stages opened outside any
+    run are collected into an implicit one.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, log_path: Optional[str] = None,
+                 interval: float = DEFAULT_INTERVAL, memory: bool = True):
+        self.enabled = profiling_enabled() if enabled is None else enabled
+        self.log_path = os.environ.get(ENV_LOG, DEFAULT_LOG_PATH) if log_path is None else log_path
+        self.interval = interval
+        self.memory = memory
+        self.last: Optional[RunReport] = None
+        self._report: Optional[RunReport] = None
+        self._run_start = 0.0
+        self._run_peak = None
+        self._path = []
+        self._sampler: Optional[_Sampler] = None
+        self._lock = threading.Lock()
+
+    def run(self, name: str, **meta):
+        """Group the stages opened inside into one report, logged on exit."""
+        if not self.enabled:
+            return _NULL
+        return self._run(name, meta)
+
+    def stage(self, name: str):
+        """Time ``name`` (and sample memory while it is open)."""
+        if not self.enabled:
+            return _NULL
+        return self._stage(name)
+
+    def start(self, name: str, **meta):
+        """Close any open run and begin a new one (no-op when disabled)."""
+        if self.enabled:
+            self.flush()
+            self._begin(name, meta)
+
+    @contextmanager
+    def _run(self, name: str, meta: dict):
+        self.start(name, **meta)
+        try:
+            yield self._report
+        finally:
+            self.flush()
+
+    @contextmanager
+    def _stage(self, name: str):
+        if self._report is None:
+            self._begin("unnamed", {})
+        peak = None
+        if self.memory:
+            start = rss_bytes()
+            if start is not None:
+                peak = [start, start]
+                self._start_sampler().open_peaks.append(peak)
+        self._path.append(name)
+        path = "/".join(self._path)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            self._path.pop()
+            if peak is not None:
+                self._sampler.sample()
+                self._sampler.open_peaks.pop()  # stages close innermost first
+                self._run_peak = max(self._run_peak or 0, peak[1])
+            self._report.stages.append(StageRecord(
+                path, t0 - self._run_start, seconds, None if peak is None else peak[1] - peak[0],
+                len(self._path)))
+
+    def _begin(self, name: str, meta: dict):
+        self._report = RunReport(name, datetime.now(timezone.utc).isoformat(), meta=meta)
+        self._run_start = time.perf_counter()
+        self._run_peak = None
+
+    def _start_sampler(self) -> _Sampler:
+        if self._sampler is None:
+            self._sampler = _Sampler(self.interval)
+            self._sampler.start()
+        return self._sampler
+
+    def flush(self) -> Optional[RunReport]:
+        """Close the current run, append it to the log and keep it as :attr:`last`."""
+        report = self._report
+        if report is None:
+            return None
+        self._report = None
+        report.seconds = time.perf_counter() - self._run_start
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+        report.peak_rss = self._run_peak
+        # Stages are appended as they close; list them in the order they opened
+        report.stages.sort(key=lambda s: s.start)
+        self.last = report
+        if self.log_path:
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(report.to_json() + "\n")
+        return report
+
+
+def render_sidebar(st, profiler: Profiler):
+    """Show the last run's stage breakdown in the Streamlit sidebar (``st`` is the streamlit module)."""
+    report = profiler.last
+    if not profiler.enabled or report is None:
+        return
+    st.sidebar.subheader("Last run profile")
+    peak = "n/a" if report.peak_rss is None else f"{report.peak_rss / 1e6:,.0f} MB"
+    st.sidebar.caption(f"{report.name}: {report.seconds:.3f} s in total, peak RSS {peak}")
+    st.sidebar.dataframe(report.summary().style.format({"seconds": "{:.3f}", "share": "{:.0%}",
+                                                        "peak_mb": "{:,.1f}"}, na_rep="–"),
+                         hide_index=True, use_container_width=True)
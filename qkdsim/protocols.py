@@ -0,0 +1,150 @@
+"""QKD protocols as array kernels on the shared engine.
+
+A protocol only describes how Alice prepares photons, which measurement axes
+Alice and Bob choose from and which photons survive sifting; the engine
+(:func:`qkdsim.engine.simulate`) does the rest for every protocol the same
+way, including Eve, noise, streaming and parallel sweeps.
+
+* ``bb84`` – two bases (rect, diag), kept when Alice's and Bob's bases match.
+* ``six_state`` – adds the circular basis; a third of the photons are kept,
+  and intercept-resend raises the QBER to 33 %.
+* ``b92`` – bit 0 is sent as 0°, bit 1 as 45°; Bob keeps only conclusive
+  results (90° in rect means 1, 135° in diag means 0).
+* ``e91`` – entangled pairs in the Φ+ state. Alice's measurement of her half
+  at one of three analyzer settings prepares Bob's photon remotely, so Bob
+  (and Eve) see an ordinary polarized photon. Equal settings give the key;
+  the other combinations estimate the CHSH value ``S`` (2√2 for the ideal
+  state, at most 2 for any local, e.g. intercepted, one).
+"""
+from typing import Optional, Union
+
+import numpy as np
+
+from qkdsim.optics import A, BASIS_LABELS, H, R, encode, random_bits, random_choice, state_code
+
+
+class Protocol:
+    """Base protocol: random basis and bit for Alice, random basis for Bob, keep equal bases."""
+    name = ""
+    label = ""
+    alice_basis_labels = BASIS_LABELS
+    bob_basis_labels = BASIS_LABELS
+    # Measurement axis (state read as bit 0) of each basis index
+    alice_axes = np.array([H, A], dtype=np.uint8)
+    bob_axes = np.array([H, A], dtype=np.uint8)
+    # (Alice settings, Bob settings) used for the CHSH estimate, if any
+    chsh_settings: Optional[tuple] = None
+    # Error rate of the sifted bits Eve intercept-resends
+    intercept_qber = 0.25
+
+    def prepare(self, n: int, rng: np.random.Generator):
+        """Alice's basis indices, bits and the states of the photons she sends."""
+        alice_basis = random_choice(rng, n, len(self.alice_axes))
+        alice_bit = random_bits(rng, n)
+        return alice_basis, alice_bit, encode(self.alice_axes[alice_basis], alice_bit)
+
+    def bob_bases(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        return random_choice(rng, n, len(self.bob_axes))
+
+    def sift(self, alice_basis: np.ndarray, bob_basis: np.ndarray, bob_bit: np.ndarray) -> np.ndarray:
+        """Mask of the photons kept for the key after the public discussion."""
+        return alice_basis == bob_basis
+
+    def expected_sift_rate(self) -> float:
+        return 1 / len(self.bob_axes)
+
+    def expected_qber(self, noise_prob: float, intercepted: float = 0.0) -> float:
+        """QBER of the sifted key with channel noise and a share of intercept-resent photons."""
+        e = intercepted * self.intercept_qber
+        return e + noise_prob * (1 - 2 * e)
+
+    def __repr__(self):
+        return f"<Protocol {self.name}>"
+
+
+class BB84(Protocol):
+    name = "bb84"
+    label = "BB84"
+
+
+class SixState(Protocol):
+    name = "six_state"
+    label = "Six-state"
+    alice_basis_labels = bob_basis_labels = ["rect", "diag", "circ"]
+    alice_axes = bob_axes = np.array([H, A, R], dtype=np.uint8)
+    intercept_qber = 1 / 3
+
+
+class B92(Protocol):
+    name = "b92"
+    label = "B92"
+
+    def prepare(self, n: int, rng: np.random.Generator):
+        # The bit selects both the basis and the state: 0 -> 0° (rect), 1 -> 45° (diag)
+        alice_bit = random_bits(rng, n)
+        return alice_bit, alice_bit, encode(self.alice_axes[alice_bit], alice_bit)
+
+    def sift(self, alice_basis, bob_basis, bob_bit):
+        # Conclusive: Bob saw the state orthogonal to one of Alice's two
+        return bob_bit != bob_basis
+
+    def expected_sift_rate(self) -> float:
+        return 0.25
+
+    def expected_qber(self, noise_prob: float, intercepted: float = 0.0) -> float:
+        # Noise and Eve's wrong guesses also turn inconclusive outcomes into conclusive ones
+        f, p = intercepted, noise_prob
+        return (f + 4 * p - 2 * f * p) / (2 + 4 * p + f - 2 * f * p)
+
+
+class E91(Protocol):
+    name = "e91"
+    label = "E91"
+    alice_basis_labels = ["0°", "22.5°", "45°"]
+    bob_basis_labels = ["22.5°", "45°", "67.5°"]
+    alice_axes = np.array([state_code(a) for a in (0, 22.5, 45)], dtype=np.uint8)
+    bob_axes = np.array([state_code(b) for b in (22.5, 45, 67.5)], dtype=np.uint8)
+    chsh_settings = ((0, 2), (0, 2))
+    # Eve measures each pair along one of Alice's three settings
+    intercept_qber = 5 / 24
+
+    def sift(self, alice_basis, bob_basis, bob_bit):
+        return self.alice_axes[alice_basis] == self.bob_axes[bob_basis]
+
+    def expected_sift_rate(self) -> float:
+        return 2 / 9
+
+
+PROTOCOLS = {p.name: p for p in (BB84(), SixState(), B92(), E91())}
+
+ProtocolLike = Union[str, Protocol]
+
+
+def get_protocol(protocol: ProtocolLike = "bb84") -> Protocol:
+    if isinstance(protocol, Protocol):
+        return protocol
+    try:
+        return PROTOCOLS[protocol]
+    except KeyError:
+        raise ValueError(f"Unknown protocol {protocol!r}, expected one of {sorted(PROTOCOLS)}") from None
+
+
+def correlation_counts(protocol: Protocol, alice_basis, bob_basis, alice_bit, bob_bit) -> np.ndarray:
+    """Counts of equal and different bits per (Alice setting, Bob setting) pair, shape (a, b, 2)."""
+    na, nb = len(protocol.alice_axes), len(protocol.bob_axes)
+    index = (alice_basis.astype(np.intp) * nb + bob_basis) * 2 + (alice_bit != bob_bit)
+    return np.bincount(index, minlength=na * nb * 2).reshape(na, nb, 2)
+
+
+def chsh_value(protocol: Protocol, counts: np.ndarray) -> Optional[float]:
+    """CHSH ``S = E(a1,b1) - E(a1,b2) + E(a2,b1) + E(a2,b2)`` from :func:`correlation_counts`."""
+    if protocol.chsh_settings is None:
+        return None
+    (a1, a2), (b1, b2) = protocol.chsh_settings
+
+    def correlation(a, b):
+        same, different = counts[a, b]
+        total = same + different
+        return (same - different) / total if total else 0.0
+
+    return float(correlation(a1, b1) - correlation(a1, b2) + correlation(a2, b1) + correlation(a2, b2))
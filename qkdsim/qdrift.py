@@ -0,0 +1,314 @@
+"""QDrift measurement log loading shared by the File analysis page and ``analiza/analiza.py``.
+
+:func:`read_csv` looks at the first :data:`SAMPLE_SIZE` bytes of a file once
+to pick the encoding (utf-8, latin1, cp1250, in that order of preference) and
+the delimiter, then parses the whole file in one pass with the pyarrow engine
+(the C engine without pyarrow). The measurement number and pin 44 / pin 45
+columns get explicit dtypes, so no type inference runs over them. Files the
+fast engines reject (ragged rows, odd quoting) are parsed again with the
+python engine as before; a decoding error further into the file moves on to
+the next encoding.
+
+:func:`to_measurements` and :func:`analyze` then work on the whole table at
+once: the pin readings are converted column-wise, one ``groupby`` on the
+measurement number counts the samples, the 3rd and 4th sample of every
+measurement (``nth(2)``, ``nth(3)``) are averaged and the active pin is
+classified with ``np.select``.
+
+Environment logs are parsed once per run by :func:`environment_table` into a
+single table indexed by the time of each reading, and
+:func:`match_environment` joins the start times of all measurement files
+(from names like ``2025-09-15_14-20-12_meas_10000.csv``) to the nearest
+reading within a tolerance with one ``merge_asof``.
+"""
+import csv
+import importlib.util
+import io
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+ENCODINGS = ["utf-8", "latin1", "cp1250"]
+DELIMITERS = ",;\t|"
+SAMPLE_SIZE = 64 * 1024
+FAST_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+
+MEASURE_NAMES = ['measurement', 'measure', 'measure_num', 'meritev', 'id', 'measurement_number', 'measurement_no',
+                 'measure_no']
+PIN44_NAMES = ['pin44', 'pin_44', 'p44', 'pin 44']
+PIN45_NAMES = ['pin45', 'pin_45', 'p45', 'pin 45']
+COLUMN_DTYPES = ("int64", "float64", "float64")
+
+# Both pins above this reading: pin 44 active
+BOTH_HIGH = 3000
+# Pin 44 below LOW_44 with pin 45 above HIGH_45: pin 45 active
+LOW_44, HIGH_45 = 40, 180
+# Measurements with fewer samples are reported as all zeros
+MIN_SAMPLES = 4
+# Environment logs: rows after the header line that are not readings, then one reading per row
+ENV_HEADER_ROWS = 6
+ENV_COLUMNS = ["DATE", "TIME", "HUMIDITY_BOX", "TEMPERATURE_BOX", "HUMIDITY_ROOM", "TEMPERATURE_ROOM"]
+# Readings further than this from a measurement's start are not used for it
+DEFAULT_ENV_TOLERANCE = pd.Timedelta(minutes=2)
+START_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+RESULT_COLUMNS = ["measurement", "total_samples", "pin44_active", "pin45_active", "avg_pin44", "avg_pin45",
+                  "out_of_range"]
+
+
+def detect_columns(columns):
+    """Names of the measurement number, pin 44 and pin 45 columns (None where not found)."""
+    columns = list(columns)
+    lower = [str(c).lower() for c in columns]
+
+    def find_name(names_list):
+        for n in names_list:
+            if n in lower:
+                return columns[lower.index(n)]
+        return None
+
+    return find_name(MEASURE_NAMES), find_name(PIN44_NAMES), find_name(PIN45_NAMES)
+
+
+def _head(file) -> bytes:
+    if hasattr(file, "read"):
+        if hasattr(file, "seek"):
+            file.seek(0)
+        head = file.read(SAMPLE_SIZE)
+        if hasattr(file, "seek"):
+            file.seek(0)
+        return head.encode("utf-8") if isinstance(head, str) else head
+    with open(file, "rb") as f:
+        return f.read(SAMPLE_SIZE)
+
+
+def _decode(head: bytes, encoding: str) -> Optional[str]:
+    try:
+        return head.decode(encoding)
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the end of the sample is fine
+        if len(head) == SAMPLE_SIZE and e.start >= len(head) - 3:
+            return head[:e.start].decode(encoding)
+        return None
+
+
+def sniff_csv(head: bytes, sep: Optional[str] = None):
+    """``(encoding, delimiter, text)`` of a file from its first bytes; ``sep`` overrides the delimiter."""
+    if head.startswith(b"\xef\xbb\xbf"):
+        encoding, text = "utf-8-sig", head[3:].decode("utf-8", errors="ignore")
+    else:
+        # latin1 decodes any byte, so one of the encodings always matches
+        for encoding in ENCODINGS:
+            text = _decode(head, encoding)
+            if text is not None:
+                break
+    if sep is None:
+        # Whole lines only: the sample may end mid-row
+        lines = text.splitlines()[:50] if len(head) < SAMPLE_SIZE else text.splitlines()[:50][:-1]
+        try:
+            sep = csv.Sniffer().sniff("\n".join(lines), delimiters=DELIMITERS).delimiter
+        except csv.Error:
+            sep = ","
+    return encoding, sep, text
+
+
+def column_dtypes(text: str, sep: str) -> dict:
+    """Explicit dtypes for the measurement and pin columns named in the header line of ``text``."""
+    header = next(csv.reader(io.StringIO(text), delimiter=sep), [])
+    return {name: dtype for name, dtype in zip(detect_columns(header), COLUMN_DTYPES) if name is not None}
+
+
+def _binary_columns(df: pd.DataFrame) -> bool:
+    """pyarrow returns a text column that is not valid in the encoding as bytes instead of failing."""
+    for col in df.columns[df.dtypes == object]:
+        first = df[col].first_valid_index()
+        if first is not None and isinstance(df[col][first], bytes):
+            return True
+    return False
+
+
+def read_csv(file, sep: Optional[str] = None, header=0) -> pd.DataFrame:
+    """Parse a CSV path or file-like object, sniffing encoding and delimiter once."""
+    encoding, sep, text = sniff_csv(_head(file), sep)
+    dtype = column_dtypes(text, sep) if header == 0 else None
+    encodings = [encoding] + [enc for enc in ENCODINGS if enc != encoding.replace("-sig", "")]
+    last_error = None
+    for enc in encodings:
+        for engine, options in ((FAST_ENGINE, {"dtype": dtype}), ("python", {})):
+            if hasattr(file, "seek"):
+                file.seek(0)
+            try:
+                df = pd.read_csv(file, sep=sep, engine=engine, encoding=enc, header=header, **options)
+            except UnicodeDecodeError as e:
+                last_error = e
+                break
+            except Exception as e:
+                last_error = e
+                continue
+            if engine == "pyarrow" and _binary_columns(df):
+                last_error = ValueError(f"{file!r} is not valid {enc} text")
+                break
+            return df
+    raise last_error
+
+
+def _numeric(column: pd.Series):
+    """Values as float and the mask of rows where ``float(value)`` would have succeeded."""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype("float64"), np.ones(len(column), dtype=bool)
+    values = pd.to_numeric(column, errors="coerce").astype("float64")
+    # A copy: under copy-on-write the array behind the Series is read-only
+    ok = values.notna().to_numpy(copy=True)
+    # Only the cells to_numeric gave up on (NaN, None, text) go through float() one by one
+    for i in np.flatnonzero(~ok):
+        try:
+            float(column.iloc[i])
+        except (TypeError, ValueError):
+            continue
+        else:
+            ok[i] = True
+    return values, ok
+
+
+def to_measurements(df: pd.DataFrame):
+    """
+    ``(frame, columns used)`` with one ``measurement, pin44, pin45`` row per usable sample.
+
+    The columns are found by name, or else taken at positions 1, 3 and 4;
+    rows whose pin readings are not numbers are dropped. ``(None, None)``
+    when no suitable columns exist.
+    """
+    measure_col, pin44_col, pin45_col = detect_columns(df.columns)
+    if measure_col and pin44_col and pin45_col:
+        columns = [df[measure_col], df[pin44_col], df[pin45_col]]
+        used = (measure_col, pin44_col, pin45_col)
+    elif df.shape[1] > 4:
+        columns = [df.iloc[:, 1], df.iloc[:, 3], df.iloc[:, 4]]
+        used = ("index_1", "index_3", "index_4")
+    else:
+        return None, None
+    pin44, ok44 = _numeric(columns[1])
+    pin45, ok45 = _numeric(columns[2])
+    keep = ok44 & ok45
+    frame = pd.DataFrame({"measurement": columns[0].to_numpy()[keep], "pin44": pin44.to_numpy()[keep],
+                          "pin45": pin45.to_numpy()[keep]})
+    if used[0] == "index_1" and frame.empty:
+        return None, None
+    return frame, used
+
+
+def active_pin(pin44, pin45) -> np.ndarray:
+    """0 where pin 44 is active, 1 where pin 45 is, 2 where the readings are out of the normal range."""
+    pin44, pin45 = np.asarray(pin44), np.asarray(pin45)
+    return np.select([(pin44 > BOTH_HIGH) & (pin45 > BOTH_HIGH), (pin44 < LOW_44) & (pin45 > HIGH_45)],
+                     [0, 1], 2)
+
+
+def analyze(frame: pd.DataFrame) -> pd.DataFrame:
+    """Per measurement: sample count, active pin and the mean of the 3rd and 4th sample, sorted by number."""
+    groups = frame.groupby("measurement", sort=True, as_index=False)
+    result = groups.size().rename(columns={"size": "total_samples"}).set_index("measurement")
+    third = groups.nth(2).set_index("measurement")
+    fourth = groups.nth(3).set_index("measurement")
+    # Measurements without a 4th sample get NaN here and are zeroed below
+    avg = (third[["pin44", "pin45"]] + fourth[["pin44", "pin45"]]).reindex(result.index) / 2.0
+    enough = (result["total_samples"] >= MIN_SAMPLES).to_numpy()
+    pin = active_pin(avg["pin44"], avg["pin45"])
+    result["pin44_active"] = np.where(enough, pin == 0, 0).astype("int64")
+    result["pin45_active"] = np.where(enough, pin == 1, 0).astype("int64")
+    result["avg_pin44"] = np.where(enough, avg["pin44"], 0.0)
+    result["avg_pin45"] = np.where(enough, avg["pin45"], 0.0)
+    result["out_of_range"] = np.where(enough, pin == 2, 0).astype("int64")
+    return result.reset_index()[RESULT_COLUMNS]
+
+
+def analyze_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Row-by-row :func:`to_measurements` + :func:`analyze`, used to check and benchmark them.
+
+    Rows are read one at a time with ``float()`` and grouped in a dict, as the
+    pages did before the analysis was vectorized.
+    """
+    measure_col, pin44_col, pin45_col = detect_columns(df.columns)
+    if measure_col and pin44_col and pin45_col:
+        columns = df[[measure_col, pin44_col, pin45_col]]
+    elif df.shape[1] > 4:
+        columns = df.iloc[:, [1, 3, 4]]
+    else:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    groups = {}
+    for measurement, pin44, pin45 in columns.itertuples(index=False):
+        try:
+            sample = (float(pin44), float(pin45))
+        except (TypeError, ValueError):
+            continue
+        if not pd.isna(measurement):
+            groups.setdefault(measurement, []).append(sample)
+    rows = []
+    for measurement in sorted(groups):
+        samples = groups[measurement]
+        if len(samples) < MIN_SAMPLES:
+            rows.append([measurement, len(samples), 0, 0, 0.0, 0.0, 0])
+            continue
+        avg44 = (samples[2][0] + samples[3][0]) / 2.0
+        avg45 = (samples[2][1] + samples[3][1]) / 2.0
+        pin = int(active_pin(avg44, avg45))
+        rows.append([measurement, len(samples), int(pin == 0), int(pin == 1), avg44, avg45, int(pin == 2)])
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def read_environment(file, sep: Optional[str] = None) -> pd.DataFrame:
+    """
+    One environment log with named columns, indexed by the time of each reading.
+
+    DATE is ``dd.mm.yyyy`` and TIME ``HH:MM``; rows whose date or time
+    cannot be read are dropped.
+    """
+    df = read_csv(file, sep=sep).iloc[ENV_HEADER_ROWS:, :len(ENV_COLUMNS)].copy()
+    df.columns = ENV_COLUMNS[:df.shape[1]]
+    date = df["DATE"].astype(str).str.extract(r"(\d{1,2}\.\d{1,2}\.\d{4})", expand=False)
+    time = df["TIME"].astype(str).str.extract(r"(\d{1,2}:\d{2})", expand=False)
+    df.index = pd.to_datetime(date + " " + time, format="%d.%m.%Y %H:%M", errors="coerce")
+    df.index.name = "ENV_TIME"
+    for col in ENV_COLUMNS[2:df.shape[1]]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df[df.index.notna()]
+
+
+def environment_table(files: Iterable, sep: Optional[str] = None) -> pd.DataFrame:
+    """All readings of ``files`` (paths or file-like objects) sorted by time; unreadable files are skipped."""
+    frames = []
+    for file in files:
+        try:
+            frames.append(read_environment(file, sep=sep))
+        except Exception:
+            continue
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames).sort_index(kind="stable")
+
+
+def file_start_time(file_names) -> pd.Series:
+    """Start time of each measurement file from its name (NaT where the name has no start time)."""
+    stems = pd.Series([str(name).split("_meas_")[0] for name in file_names], dtype=object)
+    return pd.to_datetime(stems, format=START_FORMAT, errors="coerce")
+
+
+def match_environment(file_names, env: pd.DataFrame,
+                      tolerance: pd.Timedelta = DEFAULT_ENV_TOLERANCE) -> pd.DataFrame:
+    """
+    The environment reading nearest to each file's start time, indexed by file name.
+
+    Files without a reading within ``tolerance`` (or without a start time in
+    their name) are left out.
+    """
+    names = list(dict.fromkeys(file_names))
+    if env.empty or not names:
+        return pd.DataFrame(columns=env.columns)
+    starts = pd.DataFrame({"FILE_NAME": names, "START": file_start_time(names)})
+    starts = starts.dropna(subset=["START"]).sort_values("START", kind="stable")
+    matched = pd.merge_asof(starts, env, left_on="START", right_index=True, direction="nearest",
+                            tolerance=tolerance)
+    matched = matched.dropna(subset=list(env.columns), how="all")
+    return matched.set_index("FILE_NAME")[list(env.columns)]
@@ -0,0 +1,255 @@
+"""Quantum random bits from the ANU QRNG, served through a local entropy pool.
+
+:class:`QRNGClient` splits large requests into the endpoint's maximum chunk
+size and fetches the chunks concurrently over one pooled session, retrying
+failed chunks with exponential back-off. Every returned uint8 is used as 8
+random bits.
+
+:class:`EntropyPool` keeps quantum random bytes bit-packed in a local file and
+in memory. Requests are served instantly from the buffer; a background thread
+tops the pool up from the QRNG whenever it drops below the low-water mark, so
+a simulation run never waits on the network. Bits that the pool cannot supply
+are drawn from a pseudo-random generator and counted separately.
+
+Bytes are taken from the end of the buffer and refills are appended, so the
+pool file is only ever truncated or extended, under the same lock as the
+buffer, instead of being rewritten on every request.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+ANU_URL = "https://qrng.anu.edu.au/API/jsonI.php"
+DEFAULT_POOL_PATH = ".qrng_pool.bin"
+# The ANU endpoint returns at most this many values per request
+MAX_CHUNK = 1024
+
+
+def fetch_quantum_bytes(n: int, url: str = ANU_URL, timeout: float = 5.0,
+                        session: Optional[requests.Session] = None) -> np.ndarray:
+    """Fetch ``n`` uint8 values from an ANU-compatible endpoint in one request."""
+    getter = session or requests
+    r = getter.get(url, params={"length": n, "type": "uint8"}, timeout=timeout)
+    r.raise_for_status()
+    data = r.json()
+    if not data.get("success"):
+        raise ValueError("QRNG request was not successful")
+    return np.asarray(data["data"], dtype=np.uint8)
+
+
+class QRNGClient:
+    """Chunked, concurrent QRNG client with connection pooling and retries."""
+
+    def __init__(self, url: str = ANU_URL, max_chunk: int = MAX_CHUNK, workers: int = 8,
+                 retries: int = 3, backoff: float = 0.5, timeout: float = 5.0):
+        self.url = url
+        self.max_chunk = max_chunk
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.requests_sent = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _fetch_chunk(self, n: int) -> np.ndarray:
+        for attempt in range(self.retries + 1):
+            self.requests_sent += 1
+            try:
+                return fetch_quantum_bytes(n, self.url, self.timeout, self.session)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _fetch_chunk_or_none(self, n: int) -> Optional[np.ndarray]:
+        try:
+            return self._fetch_chunk(n)
+        except Exception:
+            return None
+
+    def fetch_bytes(self, n: int, allow_partial: bool = False) -> np.ndarray:
+        """
+        Fetch ``n`` uint8 values in concurrent chunks of at most ``max_chunk``.
+
+        With ``allow_partial=True`` chunks that still fail after all retries are
+        dropped and a shorter array is returned instead of raising.
+        """
+        sizes = [min(self.max_chunk, n - i) for i in range(0, n, self.max_chunk)]
+        if not sizes:
+            return np.empty(0, dtype=np.uint8)
+        fetch = self._fetch_chunk_or_none if allow_partial else self._fetch_chunk
+        chunks = [c for c in self._executor.map(fetch, sizes) if c is not None]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint8)
+
+    def fetch_bits(self, n: int, allow_partial: bool = False) -> np.ndarray:
+        """Fetch ``n`` bits, using all 8 bits of every returned uint8."""
+        raw = self.fetch_bytes((n + 7) // 8, allow_partial)
+        return np.unpackbits(raw, count=min(n, len(raw) * 8))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EntropyPool:
+    """
+    File-backed buffer of quantum random bytes with background refill.
+
+    ``capacity`` and ``low_water`` are in bytes (8 bits each). Call
+    :meth:`take_bits` to consume bits and :meth:`stats` for the quantum vs.
+    fallback accounting.
+    """
+
+    def __init__(self, path: str = DEFAULT_POOL_PATH, capacity: int = 1 << 20,
+                 low_water: Optional[int] = None, fetch_size: int = 64 * 1024,
+                 url: str = ANU_URL, timeout: float = 5.0, autostart: bool = True,
+                 client: Optional[QRNGClient] = None):
+        self.path = path
+        self.capacity = capacity
+        self.low_water = capacity // 4 if low_water is None else low_water
+        self.fetch_size = fetch_size
+        self.client = client or QRNGClient(url, timeout=timeout)
+        self.quantum_bits_served = 0
+        self.fallback_bits_served = 0
+        self.refills = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._refill_thread = None
+        self._rng = np.random.default_rng()
+        self._buf = bytearray()
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self._buf = bytearray(f.read(capacity))
+            with self._lock:
+                self._sync_file(len(self._buf))
+        if autostart:
+            self.refill_async()
+
+    @property
+    def available_bits(self) -> int:
+        return len(self._buf) * 8
+
+    def _fetch(self, n: int) -> np.ndarray:
+        return self.client.fetch_bytes(n, allow_partial=True)
+
+    def _sync_file(self, start: int, data: bytes = b""):
+        """Cut the pool file to ``start`` bytes and append ``data`` (called with the lock held)."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r+b" if os.path.exists(self.path) else "wb") as f:
+                if os.fstat(f.fileno()).st_size < start:
+                    # The file was removed or cut behind our back: write the whole buffer again
+                    data = bytes(self._buf[:start]) + data
+                    start = 0
+                f.truncate(start)
+                f.seek(start)
+                f.write(data)
+        except OSError as e:
+            self.last_error = str(e)
+
+    def fill(self) -> int:
+        """Top the pool up to capacity (blocking); returns the number of bytes added."""
+        added = 0
+        while len(self._buf) < self.capacity:
+            try:
+                chunk = self._fetch(min(self.fetch_size, self.capacity - len(self._buf)))
+            except Exception as e:
+                self.last_error = str(e)
+                break
+            if not len(chunk):
+                self.last_error = "QRNG returned no data"
+                break
+            with self._lock:
+                start = len(self._buf)
+                self._buf.extend(chunk.tobytes())
+                self._sync_file(start, chunk.tobytes())
+            added += len(chunk)
+        if added:
+            self.refills += 1
+        return added
+
+    def refill_async(self):
+        """Start a background refill unless one is running or the pool is above low water."""
+        if len(self._buf) > self.low_water:
+            return
+        if self._refill_thread is not None and self._refill_thread.is_alive():
+            return
+        self._refill_thread = threading.Thread(target=self.fill, daemon=True)
+        self._refill_thread.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the running background refill (if any) has finished."""
+        if self._refill_thread is not None:
+            self._refill_thread.join(timeout)
+
+    def take_bits(self, n: int, fallback: bool = True) -> np.ndarray:
+        """
+        Return ``n`` bits as a uint8 array, quantum bits first.
+
+        With ``fallback=False`` only the available quantum bits are returned,
+        so the result may be shorter than ``n``.
+        """
+        with self._lock:
+            nbytes = min((n + 7) // 8, len(self._buf))
+            start = len(self._buf) - nbytes
+            raw = bytes(self._buf[start:])
+            del self._buf[start:]
+            if nbytes:
+                # Served bits leave the file before they are returned, so they are never served again
+                self._sync_file(start)
+            self.quantum_bits_served += min(n, nbytes * 8)
+        quantum = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=min(n, nbytes * 8))
+        self.refill_async()
+        if not fallback or len(quantum) == n:
+            return quantum
+        missing = n - len(quantum)
+        self.fallback_bits_served += missing
+        return np.concatenate([quantum, self._rng.integers(0, 2, missing, dtype=np.uint8)])
+
+    def return_bits(self, bits: np.ndarray):
+        """
+        Put back bits from :meth:`take_bits` that the caller did not use.
+
+        Only whole bytes return to the pool (up to capacity); the bits are no
+        longer counted as served either way.
+        """
+        nbytes = len(bits) // 8
+        with self._lock:
+            self.quantum_bits_served -= len(bits)
+            nbytes = min(nbytes, self.capacity - len(self._buf))
+            if nbytes > 0:
+                raw = np.packbits(bits[len(bits) - nbytes * 8:]).tobytes()
+                start = len(self._buf)
+                self._buf.extend(raw)
+                self._sync_file(start, raw)
+
+    def record_fallback(self, n: int):
+        """Account for ``n`` bits a caller had to draw pseudo-randomly."""
+        self.fallback_bits_served += n
+
+    def stats(self) -> dict:
+        return {
+            "available_bits": self.available_bits,
+            "quantum_bits_served": self.quantum_bits_served,
+            "fallback_bits_served": self.fallback_bits_served,
+            "refills": self.refills,
+            "refilling": self._refill_thread is not None and self._refill_thread.is_alive(),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,102 @@
+"""Local stand-in for the ANU QRNG JSON API.
+
+Serves ``/API/jsonI.php?length=N&type=uint8`` with the same response shape as
+https://qrng.anu.edu.au, backed by ``os.urandom``, so tests and benchmarks
+never wait on the real network::
+
+    with MockQRNGServer() as server:
+        pool = EntropyPool(url=server.url)
+
+It can also be started on its own with ``python -m qkdsim.qrng_server [port]``.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# The real endpoint returns at most this many values per request
+MAX_LENGTH = 1024
+
+
+class _QRNGHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            length = int(query.get("length", ["1"])[0])
+        except ValueError:
+            length = 0
+        if server.delay:
+            time.sleep(server.delay)
+        if server.fail or not 1 <= length <= server.max_length:
+            body = {"success": False}
+        else:
+            body = {
+                "type": "uint8",
+                "length": length,
+                "data": list(os.urandom(length)),
+                "success": True,
+            }
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockQRNGServer:
+    """ANU-compatible QRNG server on localhost, run in a background thread."""
+
+    def __init__(self, port: int = 0, max_length: int = MAX_LENGTH, delay: float = 0.0):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _QRNGHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.max_length = max_length
+        self._httpd.delay = delay
+        self._httpd.fail = False
+        self._httpd.requests = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/API/jsonI.php"
+
+    @property
+    def requests(self) -> int:
+        return self._httpd.requests
+
+    def set_failing(self, fail: bool = True):
+        """Make every request answer ``success: false`` (simulates an outage)."""
+        self._httpd.fail = fail
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    server = MockQRNGServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"Serving mock QRNG at {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
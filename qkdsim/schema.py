@@ -0,0 +1,103 @@
+"""Typed columnar form of a simulation run and its Arrow/Parquet export.
+
+A run is stored as one small integer or boolean array per column, so a photon
+costs a dozen bytes instead of a dict of Python strings. Bases, polarization
+states and LED outcomes become pandas Categoricals (Arrow dictionary arrays in Parquet);
+human readable text is only generated for display by
+:meth:`SimulationResult.to_dataframe`.
+"""
+from dataclasses import fields
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from qkdsim.engine import LED_LABELS, SimulationResult
+from qkdsim.optics import STATE_LABELS
+from qkdsim.protocols import get_protocol
+
+# Column name -> categories for categorical columns; everything else keeps its NumPy dtype.
+# Basis labels depend on the protocol, see _categories().
+CATEGORIES = {
+    "alice_state": STATE_LABELS,
+    "photon_state": STATE_LABELS,
+    "eve_axis": STATE_LABELS,
+    "led": LED_LABELS,
+}
+
+DTYPES = {
+    "alice_bit": np.uint8,
+    "random_outcome": bool,
+    "noise_flip": bool,
+    "bob_bit_pre_noise": np.uint8,
+    "bob_bit": np.uint8,
+    "bases_match": bool,
+    "eve_bit": np.uint8,
+    "eve_intercepted": bool,
+}
+
+
+def _categories(protocol: str) -> dict:
+    p = get_protocol(protocol)
+    return {**CATEGORIES, "alice_basis": p.alice_basis_labels, "bob_basis": p.bob_basis_labels}
+
+
+def _columns():
+    return [f for f in fields(SimulationResult) if f.name != "protocol"]
+
+
+def to_frame(result: SimulationResult) -> pd.DataFrame:
+    """Typed DataFrame with one column per :class:`SimulationResult` field (Eve columns only if set)."""
+    categories = _categories(result.protocol)
+    columns = {}
+    for f in _columns():
+        values = getattr(result, f.name)
+        if values is None:
+            continue
+        if f.name in categories:
+            columns[f.name] = pd.Categorical.from_codes(values.astype(np.int8), categories[f.name])
+        else:
+            columns[f.name] = values
+    df = pd.DataFrame(columns)
+    df.attrs["protocol"] = result.protocol
+    return df
+
+
+def from_frame(df: pd.DataFrame, protocol: Optional[str] = None) -> SimulationResult:
+    """Inverse of :func:`to_frame`."""
+    protocol = protocol or df.attrs.get("protocol", "bb84")
+    categories = _categories(protocol)
+    values = {}
+    for f in _columns():
+        if f.name not in df.columns:
+            values[f.name] = None
+            continue
+        col = df[f.name]
+        if f.name in categories:
+            cats = pd.Categorical(col, categories=categories[f.name])
+            values[f.name] = cats.codes.astype(np.int8 if f.name == "led" else np.uint8)
+        else:
+            values[f.name] = col.to_numpy(dtype=DTYPES[f.name])
+    return SimulationResult(**values, protocol=protocol)
+
+
+def to_arrow(result: SimulationResult):
+    """The run as a ``pyarrow.Table`` (categoricals become dictionary columns, protocol in the metadata)."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(to_frame(result), preserve_index=False)
+    return table.replace_schema_metadata({**table.schema.metadata, b"protocol": result.protocol.encode()})
+
+
+def write_parquet(result: SimulationResult, path, compression: str = "zstd"):
+    import pyarrow.parquet as pq
+
+    pq.write_table(to_arrow(result), path, compression=compression)
+
+
+def read_parquet(path) -> SimulationResult:
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    protocol = (table.schema.metadata or {}).get(b"protocol", b"bb84").decode()
+    return from_frame(table.to_pandas(), protocol)
@@ -0,0 +1,146 @@
+"""Streaming QKD simulation in fixed-size blocks.
+
+Only one block of photons is alive at a time; everything else is folded into
+:class:`RunningStats`, so memory stays flat no matter how many photons are
+sent and callers can report progress between blocks.
+"""
+from dataclasses import fields
+from typing import Iterator, Optional
+
+import numpy as np
+
+from qkdsim.detection import SequentialTest
+from qkdsim.engine import RNGLike, SimulationResult, role_streams, simulate
+from qkdsim.eve import EveStrategy
+from qkdsim.protocols import ProtocolLike, chsh_value, correlation_counts, get_protocol
+
+DEFAULT_BLOCK_SIZE = 1_000_000
+
+
+class RunningStats:
+    """Running counters over the sifted key of a streamed run."""
+
+    def __init__(self, n_total: int, tail_size: int = 256, protocol: ProtocolLike = "bb84"):
+        self.n_total = n_total
+        self.protocol = get_protocol(protocol)
+        self.tail_size = tail_size
+        self.photons = 0
+        self.sifted = 0
+        self.errors = 0
+        # Fair-coin outcomes, the ones Bob can take from the QRNG
+        self.random_outcomes = 0
+        self.key_tail = np.empty(0, dtype=np.uint8)
+        # Per-setting correlation counts for the CHSH estimate (E91)
+        self.correlations = None
+
+    @property
+    def qber(self) -> float:
+        return self.errors / self.sifted if self.sifted else 0.0
+
+    @property
+    def chsh(self) -> Optional[float]:
+        if self.correlations is None:
+            return None
+        return chsh_value(self.protocol, self.correlations)
+
+    @property
+    def progress(self) -> float:
+        return self.photons / self.n_total if self.n_total else 1.0
+
+    def update(self, block: SimulationResult):
+        key = block.sifted_key()
+        self.photons += block.n
+        self.sifted += len(key)
+        self.errors += block.errors
+        self.random_outcomes += block.fair_outcomes
+        if self.protocol.chsh_settings is not None:
+            counts = correlation_counts(self.protocol, block.alice_basis, block.bob_basis,
+                                        block.alice_bit, block.bob_bit)
+            self.correlations = counts if self.correlations is None else self.correlations + counts
+        if self.tail_size:
+            self.key_tail = np.concatenate([self.key_tail, key[-self.tail_size:]])[-self.tail_size:]
+
+    def as_dict(self) -> dict:
+        return {
+            "photons": self.photons,
+            "sifted": self.sifted,
+            "errors": self.errors,
+            "qber": self.qber,
+            "chsh": self.chsh,
+        }
+
+
+def simulate_blocks(n: int, eve_on: bool = False, noise_prob: float = 0.0,
+                    block_size: int = DEFAULT_BLOCK_SIZE,
+                    rng: RNGLike = None,
+                    quantum_bits: Optional[np.ndarray] = None,
+                    eve: Optional[EveStrategy] = None,
+                    protocol: ProtocolLike = "bb84") -> Iterator[SimulationResult]:
+    """Yield the run as consecutive :class:`SimulationResult` blocks of ``block_size`` photons."""
+    rng = role_streams(rng)
+    used = 0
+    remaining = n
+    while remaining > 0:
+        size = min(block_size, remaining)
+        bits = quantum_bits[used:] if quantum_bits is not None else None
+        block = simulate(size, eve_on, noise_prob, rng=rng, quantum_bits=bits, eve=eve, protocol=protocol)
+        if quantum_bits is not None:
+            used += block.fair_outcomes
+        remaining -= size
+        yield block
+
+
+def concat_blocks(blocks: list) -> SimulationResult:
+    """Join consecutive blocks of one run back into a single :class:`SimulationResult`."""
+    columns = {}
+    for f in fields(SimulationResult):
+        value = getattr(blocks[0], f.name)
+        if isinstance(value, np.ndarray):
+            value = np.concatenate([getattr(block, f.name) for block in blocks])
+        columns[f.name] = value
+    return SimulationResult(**columns)
+
+
+def simulate_until_decided(n: int, detector: SequentialTest, eve_on: bool = False, noise_prob: float = 0.0,
+                           block_size: int = DEFAULT_BLOCK_SIZE,
+                           rng: RNGLike = None,
+                           quantum_bits: Optional[np.ndarray] = None,
+                           eve: Optional[EveStrategy] = None,
+                           protocol: ProtocolLike = "bb84") -> SimulationResult:
+    """
+    In-memory run that stops after the block in which ``detector`` decides.
+
+    Returns the photons simulated up to then as one result.
+    """
+    blocks = []
+    offset = 0
+    for block in simulate_blocks(n, eve_on, noise_prob, block_size, rng, quantum_bits, eve, protocol):
+        blocks.append(block)
+        decided = detector.observe(block, offset) is not None
+        offset += block.n
+        if decided:
+            break
+    return concat_blocks(blocks)
+
+
+def run_streaming(n: int, eve_on: bool = False, noise_prob: float = 0.0,
+                  block_size: int = DEFAULT_BLOCK_SIZE, tail_size: int = 256,
+                  rng: RNGLike = None,
+                  quantum_bits: Optional[np.ndarray] = None,
+                  detector: Optional[SequentialTest] = None,
+                  eve: Optional[EveStrategy] = None,
+                  protocol: ProtocolLike = "bb84") -> Iterator[RunningStats]:
+    """
+    Simulate ``n`` photons block by block, yielding the updated stats after each block.
+
+    With a ``detector`` the run stops after the block in which the sequential
+    test reaches a decision.
+    """
+    stats = RunningStats(n, tail_size, protocol)
+    for block in simulate_blocks(n, eve_on, noise_prob, block_size, rng, quantum_bits, eve, protocol):
+        offset = stats.photons
+        stats.update(block)
+        decided = detector is not None and detector.observe(block, offset) is not None
+        yield stats
+        if decided:
+            return
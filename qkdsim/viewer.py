@@ -0,0 +1,50 @@
+"""Paged, filtered views of a simulation run for the results table.
+
+Only the rows of the visible page are turned into a DataFrame, and the
+highlighting is built as whole-column masks instead of per-cell / per-row
+Styler callbacks, so rendering cost depends on the page size, not on ``n``.
+"""
+import numpy as np
+import pandas as pd
+
+from qkdsim.engine import SimulationResult
+
+MATCH_STYLE = "background-color: lightgreen; font-weight: bold"
+MISMATCH_STYLE = "background-color: violet"
+
+# View name -> row mask over the run (None = all photons)
+VIEWS = {
+    "All photons": lambda r: None,
+    "Matching bases (sifted key)": lambda r: r.bases_match,
+    "Mismatched sifted bits only": lambda r: r.bases_match & (r.alice_bit != r.bob_bit),
+    "Random outcomes": lambda r: r.random_outcome,
+    "Quantum noise flips": lambda r: r.noise_flip,
+}
+
+
+def view_rows(result: SimulationResult, view: str):
+    """Photon indices shown by ``view``; None means every photon in order."""
+    mask = VIEWS[view](result)
+    return None if mask is None else np.flatnonzero(mask)
+
+
+def page_count(total_rows: int, page_size: int) -> int:
+    return max(1, -(-total_rows // page_size))
+
+
+def page_frame(result: SimulationResult, rows, page: int, page_size: int) -> pd.DataFrame:
+    """DataFrame for one page (1-based) of ``rows`` as returned by :func:`view_rows`."""
+    start = (page - 1) * page_size
+    if rows is None:
+        return result.to_dataframe(start, start + page_size)
+    return result.to_dataframe(rows=rows[start:start + page_size])
+
+
+def highlight_styles(df: pd.DataFrame) -> pd.DataFrame:
+    """CSS for every cell of ``df``, for ``Styler.apply(..., axis=None)``."""
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+    match = (df["Bases match"] == "Yes").to_numpy()
+    styles.loc[match, "Bases match"] = MATCH_STYLE
+    mismatch = match & (df["Alice bit"] != df["Bob bit"]).to_numpy()
+    styles.loc[mismatch, "Bob bit"] = MISMATCH_STYLE
+    return styles